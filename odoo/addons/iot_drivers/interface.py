@@ -34,7 +34,16 @@ class Interface(Thread):
     def add_device(self, identifier, device):
         if identifier in iot_devices:
             return
+        self._register_device(identifier, *self._probe_device(identifier, device))
 
+    def _probe_device(self, identifier, device):
+        """
+        Find the driver supporting ``device`` and instantiate it, without
+        touching ``iot_devices`` / ``unsupported_devices``.
+
+        :return: (driver class or None, driver instance or None, error raised
+            while instantiating the driver or None)
+        """
         try:
             supported_driver = next(
                 (driver for driver in self.drivers if driver.supported(device)),
@@ -42,36 +51,47 @@ class Interface(Thread):
             )
         except Exception as e:
             _logger.exception("❌ Error checking driver support for device %s: %s", identifier, e)
-            supported_driver = None
+            return None, None, None
+
+        if not supported_driver:
+            return None, None, None
+
+        try:
+            return supported_driver, supported_driver(identifier, device), None
+        except Exception as e:
+            _logger.exception("❌ Failed to initialize driver %s for device %s", supported_driver.__name__,
+                              identifier)
+            return supported_driver, None, e
 
-        if supported_driver:
+    def _register_device(self, identifier, supported_driver, driver, error):
+        """Record the result of ``_probe_device`` and start the driver thread."""
+        if driver is not None:
             try:
                 _logger.info('Device %s is now connected', identifier)
-                if identifier in unsupported_devices:
-                    del unsupported_devices[identifier]
-                d = supported_driver(identifier, device)
-                iot_devices[identifier] = d
+                unsupported_devices.pop(identifier, None)
+                iot_devices[identifier] = driver
                 # Start the thread after creating the iot_devices entry so the
                 # thread can assume the iot_devices entry will exist while it's
                 # running, at least until the `disconnect` above gets triggered
                 # when `removed` is not empty.
-                d.start()
+                driver.start()
             except Exception as e:
-                _logger.exception("❌ Failed to initialize driver %s for device %s", supported_driver.__name__,
+                _logger.exception("❌ Failed to start driver %s for device %s", supported_driver.__name__,
                                   identifier)
-                # Премахваме от iot_devices ако е било добавено
-                if identifier in iot_devices:
-                    del iot_devices[identifier]
-                # Добавяме като unsupported
-                if self.allow_unsupported:
-                    unsupported_devices[identifier] = {
-                        'name': f'Failed device ({self.connection_type})',
-                        'identifier': identifier,
-                        'type': 'error',
-                        'connection': 'direct' if self.connection_type == 'usb' else self.connection_type,
-                        'error': str(e),
-                    }
-        elif self.allow_unsupported and identifier not in unsupported_devices:
+                iot_devices.pop(identifier, None)
+                error = e
+
+        if error is not None:
+            # Добавяме като unsupported
+            if self.allow_unsupported:
+                unsupported_devices[identifier] = {
+                    'name': f'Failed device ({self.connection_type})',
+                    'identifier': identifier,
+                    'type': 'error',
+                    'connection': 'direct' if self.connection_type == 'usb' else self.connection_type,
+                    'error': str(error),
+                }
+        elif not supported_driver and self.allow_unsupported and identifier not in unsupported_devices:
             _logger.info('Unsupported device %s is now connected', identifier)
             unsupported_devices[identifier] = {
                 'name': f'Unknown device ({self.connection_type})',
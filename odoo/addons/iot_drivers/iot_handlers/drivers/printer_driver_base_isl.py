@@ -12,19 +12,118 @@ ISL Fiscal Printer Base Driver
 - Конкретните драйвери имплементират само detect_device() и _isl_request()
 """
 
+import array
 import logging
+import os
+import select
+import sys
 import time
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum
-from typing import Dict, List, Optional, Tuple, Any
+from functools import partial
+from itertools import chain
+from operator import attrgetter
+from threading import Lock
+from typing import Dict, List, Mapping, Optional, Tuple, Any
 
-from .serial_base_driver import SerialDriver
+import serial
+
+from .serial_base_driver import SerialDriver, SerialProtocol
 
 _logger = logging.getLogger(__name__)
 
+# (име на драйвер, порт) → time.monotonic() на последната неуспешна детекция.
+# SerialInterface повтаря неподдържаните портове на всеки няколко секунди -
+# без това един и същ драйвер пуска отново пълната проба на всички baudrate-и.
+_DETECTION_FAILURES: Dict[Tuple[str, str], float] = {}
+# SerialInterface пробва няколко порта паралелно
+_DETECTION_FAILURES_LOCK = Lock()
+
+
+def chunk_reader(conn):
+    """
+    Връща функция read_chunk(size=1, timeout=None), която прочита
+    наличните байтове или блокира до първия байт / timeout (по
+    подразбиране read timeout-а на порта).
+
+    На Linux чете директно от файловия дескриптор (select + os.read) и
+    заобикаля Python цикъла и in_waiting ioctl-а на pyserial - size там
+    е без значение, взима се всичко налично, а timeout отива направо в
+    select() без преконфигуриране на порта. На други платформи (или ако
+    портът няма fileno) - през conn.read, като блокира до size байта,
+    за да не се върти цикълът за всеки пристигнал фрагмент.
+    """
+    fd = None
+    if sys.platform.startswith("linux"):
+        try:
+            fd = conn.fileno()
+        except Exception:
+            fd = None
+
+    if fd is None:
+        read = conn.read
+
+        def read_chunk(size=1, timeout=None):
+            if timeout is not None and conn.timeout != timeout:
+                conn.timeout = timeout
+            return read(max(conn.in_waiting, size))
+
+        return read_chunk
+
+    def read_chunk(size=1, timeout=None):
+        if not select.select((fd,), (), (), conn.timeout if timeout is None else timeout)[0]:
+            return b""
+        buf = os.read(fd, 4096)
+        if not buf:
+            # Същата проверка като в pyserial - устройството е изключено
+            raise serial.SerialException("device reports readiness to read but returned no data")
+        return buf
+
+    return read_chunk
+
+
+def read_until_byte(
+        connection,
+        terminator: int,
+        timeout_s: float,
+        first_byte_s: Optional[float] = None,
+) -> bytes:
+    """
+    Чете от connection до байта terminator или до изтичане на timeout_s.
+
+    Използва се при детекция вместо фиксирани sleep-ове + read(N) - връща
+    веднага щом пристигне терминаторът. Всяко четене чака за оставащото
+    време, така че тихо устройство не върти цикъла, а отговорилото се
+    чете наведнъж с всичко чакащо.
+
+    first_byte_s: ако е зададено и до тогава не пристигне нито байт,
+    се връща празен отговор, без да се чака целия timeout_s (бързо
+    отхвърляне на грешен baudrate / липсващо устройство).
+    """
+    response = bytearray()
+    read_chunk = chunk_reader(connection)
+    saved_timeout = connection.timeout
+    try:
+        deadline = time.monotonic() + timeout_s
+        remaining = timeout_s
+        if first_byte_s is not None and first_byte_s < remaining:
+            remaining = first_byte_s
+        while remaining > 0:
+            chunk = read_chunk(1, remaining)
+            if not chunk:
+                break
+            response.extend(chunk)
+            if chunk.find(terminator) >= 0:
+                break
+            remaining = deadline - time.monotonic()
+    finally:
+        if connection.timeout != saved_timeout:
+            connection.timeout = saved_timeout
+    return bytes(response)
+
 
 # ====================== Общи енумерации / типове ======================
 
@@ -149,6 +248,10 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
 
     device_type = "fiscal_printer"
 
+    # След неуспешна детекция драйверът не се предлага за същия порт толкова
+    # секунди - interface-ът минава към следващия драйвер по приоритет
+    DETECTION_RETRY_INTERVAL = 60
+
     # ====================== ВСИЧКИ ISL КОМАНДИ НА ЕДНО МЯСТО ======================
 
     # Общи команди (0x20-0x2F)
@@ -217,6 +320,32 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
 
     # ====================== КРАЙ НА КОМАНДНИ КОНСТАНТИ ======================
 
+    # Шаблон за protocol след успешна детекция (name/baudrate се попълват в __init__)
+    _DETECTED_PROTOCOL = SerialProtocol(
+        name="ISL",
+        baudrate=None,
+        bytesize=serial.EIGHTBITS,
+        stopbits=serial.STOPBITS_ONE,
+        parity=serial.PARITY_NONE,
+        timeout=1.0,
+        writeTimeout=1.0,
+        measureRegexp=None,
+        statusRegexp=None,
+        commandTerminator=b"",
+        commandDelay=0.2,
+        measureDelay=0.5,
+        newMeasureDelay=0.2,
+        measureCommand=b"",
+        emptyAnswerValid=False,
+    )
+
+    _DEFAULT_OPTIONS = {
+        "Operator.ID": "1",
+        "Operator.Password": "0000",
+        "Administrator.ID": "20",
+        "Administrator.Password": "9999",
+    }
+
     def __init__(self, identifier, device):
         """
         Инициализация на ISL драйвер.
@@ -259,8 +388,6 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
             _logger.debug(f"{'=' * 60}")
 
             try:
-                import serial
-
                 # Отваряме connection (подобно на IChannel creation в .NET)
                 connection = serial.Serial(
                     port=port,
@@ -274,10 +401,12 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
 
                 _logger.debug(f"   ✅ Connection opened at {try_baudrate} baud")  # ПРОМЯНА: DEBUG
 
-                # Изчисти буферите
+                # Изчисти буферите и изчакай линията да замлъкне
+                # (вместо фиксиран sleep(0.3) на всеки baudrate)
+                self._enable_low_latency(connection)
                 connection.reset_input_buffer()
                 connection.reset_output_buffer()
-                time.sleep(0.3)
+                self._drain_until_idle(connection)
 
                 # Опит за детекция (подобно на GetRawDeviceInfo в .NET)
                 device_info = self.detect_device(connection, try_baudrate)
@@ -302,8 +431,13 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
             # ПРОМЯНА: DEBUG вместо WARNING
             _logger.debug(f"⚠️ {self.__class__.__name__}: Device not detected on {port}")
             _logger.debug("=" * 80)
+            with _DETECTION_FAILURES_LOCK:
+                _DETECTION_FAILURES[(self.__class__.__name__, port)] = time.monotonic()
             raise RuntimeError(f"{self.__class__.__name__} could not detect device on {port}")
 
+        with _DETECTION_FAILURES_LOCK:
+            _DETECTION_FAILURES.pop((self.__class__.__name__, port), None)
+
         _logger.info("=" * 80)
         _logger.info(f"✅ {self.__class__.__name__} initialized successfully")
         _logger.info(f"   Model: {device_info.get('model')}")
@@ -312,32 +446,9 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
         _logger.info("=" * 80)
 
         # Сега създаваме protocol обект с правилния baudrate
-        from collections import namedtuple
-        import serial
-
-        Protocol = namedtuple('Protocol', [
-            'name', 'baudrate', 'bytesize', 'stopbits', 'parity',
-            'timeout', 'writeTimeout', 'measureRegexp', 'statusRegexp',
-            'commandTerminator', 'commandDelay', 'measureDelay',
-            'newMeasureDelay', 'measureCommand', 'emptyAnswerValid'
-        ])
-
-        self._protocol = Protocol(
+        self._protocol = self._DETECTED_PROTOCOL._replace(
             name=device_info.get('protocol_name', 'ISL'),
             baudrate=device_info['detected_baudrate'],
-            bytesize=serial.EIGHTBITS,
-            stopbits=serial.STOPBITS_ONE,
-            parity=serial.PARITY_NONE,
-            timeout=1.0,
-            writeTimeout=1.0,
-            measureRegexp=None,
-            statusRegexp=None,
-            commandTerminator=b"",
-            commandDelay=0.2,
-            measureDelay=0.5,
-            newMeasureDelay=0.2,
-            measureCommand=b"",
-            emptyAnswerValid=False,
         )
 
         # SerialDriver.__init__(identifier, device) очаква device да е string path
@@ -359,12 +470,7 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
         )
 
         # Default options
-        self.options: Dict[str, str] = {
-            "Operator.ID": "1",
-            "Operator.Password": "0000",
-            "Administrator.ID": "20",
-            "Administrator.Password": "9999",
-        }
+        self.options: Dict[str, str] = dict(self._DEFAULT_OPTIONS)
 
     @classmethod
     def get_baudrates_to_try(cls) -> List[int]:
@@ -375,6 +481,76 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
         """
         return [115200, 38400, 9600, 19200]
 
+    @classmethod
+    def _detection_failed_recently(cls, port: str) -> bool:
+        """Дали детекцията на този драйвер на port е пропаднала преди < DETECTION_RETRY_INTERVAL."""
+        with _DETECTION_FAILURES_LOCK:
+            failed_at = _DETECTION_FAILURES.get((cls.__name__, port))
+        return failed_at is not None and time.monotonic() - failed_at < cls.DETECTION_RETRY_INTERVAL
+
+    @staticmethod
+    def _drain_until_idle(connection, idle_s: float = 0.02, max_s: float = 0.15) -> int:
+        """
+        Изхвърля входящите байтове, докато линията не замълчи за idle_s
+        (или до max_s общо). Тиха линия струва едно четене от idle_s.
+
+        Връща броя изхвърлени байтове.
+        """
+        drained = 0
+        saved_timeout = connection.timeout
+        connection.timeout = idle_s
+        try:
+            deadline = time.monotonic() + max_s
+            while time.monotonic() < deadline:
+                chunk = connection.read(connection.in_waiting or 1)
+                if not chunk:
+                    break
+                drained += len(chunk)
+        finally:
+            connection.timeout = saved_timeout
+        return drained
+
+    @staticmethod
+    def _enable_low_latency(connection) -> bool:
+        """
+        Включва ASYNC_LOW_LATENCY на порта (Linux, TIOCGSERIAL/TIOCSSERIAL).
+
+        USB-serial адаптерите (FTDI и др.) задържат входящите байтове до
+        latency timer-а си (16 ms по подразбиране), а ISL кадрите са по
+        няколко десетки байта - всеки отговор чака целия таймер. Флагът
+        свежда това до ~1 ms. Портове без serial_struct (някои CDC-ACM)
+        отказват ioctl-а - тогава просто връщаме False.
+        """
+        if not sys.platform.startswith("linux"):
+            return False
+        try:
+            import fcntl
+            import termios
+
+            ASYNC_LOW_LATENCY = 1 << 13
+            fd = connection.fileno()
+            # serial_struct се чете/пише цял - както pyserial при custom baudrate;
+            # flags е петото int поле (type, line, port, irq, flags, ...)
+            buf = array.array("i", [0] * 64)
+            fcntl.ioctl(fd, termios.TIOCGSERIAL, buf)
+            if buf[4] & ASYNC_LOW_LATENCY:
+                return True
+            buf[4] |= ASYNC_LOW_LATENCY
+            fcntl.ioctl(fd, termios.TIOCSSERIAL, buf)
+            return True
+        except Exception as e:
+            _logger.debug(f"Low latency mode not available: {e}")
+            return False
+
+    _chunk_reader = staticmethod(chunk_reader)
+    _read_until_byte = staticmethod(read_until_byte)
+
+    @classmethod
+    def _detection_exchange(cls, connection, message: bytes) -> bytes:
+        """Изпраща детекционна заявка и чете отговора до ETX (0x0A)."""
+        connection.write(message)
+        return cls._read_until_byte(connection, 0x0A, timeout_s=1.2)
+
     # ---------------------- Абстрактни ниско ниво методи ----------------------
 
     @classmethod
@@ -425,7 +601,7 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def get_payment_type_mappings(self) -> Dict[PaymentType, str]:
+    def get_payment_type_mappings(self) -> Mapping[PaymentType, str]:
         """
         Mapping от PaymentType към кодовете в ISL протокола (различен за бранд).
         """
@@ -1163,6 +1339,55 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
         _resp, status = self.print_last_receipt_duplicate()
         return status
 
+    # ---------------------- POS → ISL действия по IoT канала ----------------------
+
+    # POS действия, които връщат само DeviceStatus
+    _POS_ACTIONS_SIMPLE = (
+        "pos_deposit_money",
+        "pos_withdraw_money",
+        "pos_x_report",
+        "pos_z_report",
+        "pos_print_duplicate",
+    )
+    # POS действия, които връщат (info, DeviceStatus)
+    _POS_ACTIONS_WITH_INFO = (
+        "pos_print_receipt",
+        "pos_print_reversal_receipt",
+    )
+
+    def _register_pos_actions(self):
+        """Регистрира pos_* helper-ите като действия в self._actions."""
+        self._actions.update({
+            name: partial(self._run_pos_receipt_action, name)
+            for name in self._POS_ACTIONS_WITH_INFO
+        })
+        self._actions.update({
+            name: partial(self._run_pos_action, name)
+            for name in self._POS_ACTIONS_SIMPLE
+        })
+
+    @staticmethod
+    def _build_response(status: DeviceStatus, info=None) -> Dict[str, Any]:
+        """Унифициран отговор за POS действията."""
+        response = {
+            "ok": status.ok,
+            "messages": list(map(attrgetter("text"), chain(status.messages, status.errors))),
+        }
+        if info is not None:
+            response["info"] = info
+        return response
+
+    def _run_pos_action(self, name: str, data: dict):
+        """Вика POS helper-а `name` с payload-а от IoT канала."""
+        status = getattr(self, name)(data.get("data") or data)
+        return self._build_response(status)
+
+    def _run_pos_receipt_action(self, name: str, data: dict):
+        """Като _run_pos_action, но за бонове (връщат и info)."""
+        pos_receipt = data.get("data") or data.get("receipt") or {}
+        info, status = getattr(self, name)(pos_receipt)
+        return self._build_response(status, info)
+
     # ---------------------- Поддръжка / избор на устройство ----------------------
 
     @classmethod
@@ -1211,6 +1436,10 @@ class IslFiscalPrinterBase(SerialDriver, ABC):
             _logger.info(f"❌ {cls.__name__}: Not a serial port: {port}")
             return False
 
+        if cls._detection_failed_recently(port):
+            _logger.info(f"⏭️ {cls.__name__}: Detection failed recently on {port} - skipping")
+            return False
+
         _logger.info(f"✅ {cls.__name__}: Valid serial port: {port}")
         _logger.info(f"✅ {cls.__name__}: Will attempt detection in __init__")
         _logger.info("=" * 80)
@@ -1,12 +1,12 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 import logging
-import time
 
 import serial
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Dict, Optional, Tuple, List, Any
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple, List, Any, Mapping
 
 from odoo.addons.iot_drivers.iot_handlers.drivers.serial_base_driver import (
     SerialProtocol,
@@ -25,6 +25,11 @@ from odoo.addons.iot_drivers.main import iot_devices
 
 _logger = logging.getLogger(__name__)
 
+# Стъпка за quantize на суми - quantize + str е по-бързо от разбора
+# на format spec при всеки f"{x:.2f}"
+_Q2 = Decimal("0.01")
+_ZERO = Decimal(0)
+
 
 # ====================== Daisy специфичен DeviceInfo ======================
 
@@ -33,12 +38,6 @@ class DaisyDeviceInfo(IslDeviceInfo):
     manufacturer: str = "Daisy"
     operator_password_max_length: int = 6
 
-    def as_dict(self) -> Dict[str, Any]:
-        base = super().as_dict()
-        base["manufacturer"] = self.manufacturer
-        base["operator_password_max_length"] = self.operator_password_max_length
-        return base
-
 
 # ====================== Serial протокол ======================
 
@@ -61,6 +60,23 @@ DaisyIslProtocol = SerialProtocol(
 )
 
 
+def _index_status_bits(bits_strings):
+    """
+    STATUS_BITS_STRINGS (по 8 записа на байт, bit0..bit7) →
+    ((маска, {бит: (код, текст, тип)}), ...) само за записите с текст.
+    """
+    table = []
+    for start in range(0, len(bits_strings), 8):
+        mask = 0
+        entries = {}
+        for bit, (code, text, msg_type) in enumerate(bits_strings[start:start + 8]):
+            if text:
+                mask |= 1 << bit
+                entries[bit] = (code, text, msg_type)
+        table.append((mask, entries))
+    return tuple(table)
+
+
 # ====================== Daisy ISL драйвер ======================
 class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
     """
@@ -79,11 +95,34 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
 
     SERIAL_NUMBER_PREFIX = "DY"
 
+    # Daisy използва стандартните А-З групи в ISL слой
+    _TAX_GROUP_MAP = {
+        TaxGroup.TaxGroup1: "А",
+        TaxGroup.TaxGroup2: "Б",
+        TaxGroup.TaxGroup3: "В",
+        TaxGroup.TaxGroup4: "Г",
+        TaxGroup.TaxGroup5: "Д",
+        TaxGroup.TaxGroup6: "Е",
+        TaxGroup.TaxGroup7: "Ж",
+        TaxGroup.TaxGroup8: "З",
+    }
+
+    # Аналог на C# GetPaymentTypeMappings
+    _PAYMENT_TYPE_MAP = MappingProxyType({
+        PaymentType.CASH: "P",
+        PaymentType.CARD: "C",
+        PaymentType.CHECK: "N",
+        PaymentType.RESERVED1: "D",
+    })
+
     # Daisy специфични командни кодове от C# (Commands.cs)
     CMD_GET_DEVICE_CONSTANTS = 0x80
     CMD_ABORT_FISCAL_RECEIPT = 0x82
     CMD_FISCAL_RECEIPT_SALE_DEPARTMENT = 0x8A
 
+    # Детекционната заявка е постоянна: STX, CMD_GET_DEVICE_CONSTANTS, ETX
+    _DETECT_PROBE = bytes((0x02, CMD_GET_DEVICE_CONSTANTS, 0x0A))
+
     def __init__(self, identifier, device):
         super().__init__(identifier, device)
         self.info = DaisyDeviceInfo()
@@ -95,15 +134,7 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
             "Administrator.Password": "9999",
         })
         # POS → ISL действия
-        self._actions.update({
-            "pos_print_receipt": self._action_pos_print_receipt,
-            "pos_print_reversal_receipt": self._action_pos_print_reversal_receipt,
-            "pos_deposit_money": self._action_pos_deposit_money,
-            "pos_withdraw_money": self._action_pos_withdraw_money,
-            "pos_x_report": self._action_pos_x_report,
-            "pos_z_report": self._action_pos_z_report,
-            "pos_print_duplicate": self._action_pos_print_duplicate,
-        })
+        self._register_pos_actions()
 
     # ====================== DETECTION METHOD ======================
     @classmethod
@@ -114,15 +145,8 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
         Daisy използва ISL протокол със serial prefix "DY".
         """
         try:
-            CMD_GET_DEVICE_CONSTANTS = 0x80
-
             # Изпращаме device constants команда
-            message = cls._build_isl_detection_message(CMD_GET_DEVICE_CONSTANTS, b'')
-
-            connection.write(message)
-            time.sleep(0.2)
-
-            response = connection.read(256)
+            response = cls._detection_exchange(connection, cls._DETECT_PROBE)
 
             if not response or len(response) < 10:
                 return None
@@ -131,10 +155,8 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
             if response[0] != 0x02:
                 return None
 
-            # Проверка за "DY" префикс
-            data_str = response.decode('cp1251', errors='ignore')
-
-            if 'DY' not in data_str[:20]:
+            # Проверка за "DY" префикс - ASCII е, няма нужда от decode
+            if b'DY' not in response[:20]:
                 return None
 
             # Парсване на device info
@@ -154,17 +176,6 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
             _logger.debug(f"Daisy detection failed: {e}")
             return None
 
-    @staticmethod
-    def _build_isl_detection_message(cmd: int, data: bytes) -> bytes:
-        """Сглобява ISL съобщение за детекция."""
-        STX = 0x02
-        ETX = 0x0A
-
-        cmd_byte = bytes([cmd])
-        message = bytes([STX]) + cmd_byte + data + bytes([ETX])
-
-        return message
-
     @staticmethod
     def _parse_daisy_device_info(response: bytes) -> Optional[Dict[str, Any]]:
         """Парсва Daisy device info."""
@@ -198,59 +209,6 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
             _logger.debug(f"Failed to parse Daisy device info: {e}")
             return None
 
-    def _action_pos_print_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_reversal_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_reversal_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_deposit_money(self, data: dict):
-        status = self.pos_deposit_money(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_withdraw_money(self, data: dict):
-        status = self.pos_withdraw_money(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_x_report(self, data: dict):
-        status = self.pos_x_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_z_report(self, data: dict):
-        status = self.pos_z_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_duplicate(self, data: dict):
-        status = self.pos_print_duplicate(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
     # ---------------------- Поддръжка / избор на устройство ----------------------
 
     @classmethod
@@ -299,7 +257,7 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
         Daisy протокол: "10$<amount>"
         (от BgDaisyIslFiscalPrinter.SubtotalChangeAmount).
         """
-        payload = f"10${amount:.2f}"
+        payload = f"10${amount.quantize(_Q2)}"
         resp, status, _ = self._isl_request(self.CMD_SUBTOTAL, payload)
         return resp, status
 
@@ -319,8 +277,6 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
 
         department@price[*qty][(, или $)modifier]
         """
-        from decimal import Decimal as D
-
         if department <= 0:
             # при департамент <= 0, C# пада към base.AddItem – тук или викаме базовия add_item,
             # или хвърляме, според нуждите. Ползваме базовия:
@@ -335,9 +291,9 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
                 item_code=item_code,
             )
 
-        item_data = f"{department}@{unit_price:.2f}"
+        item_data = f"{department}@{unit_price.quantize(_Q2)}"
 
-        if quantity != D("0"):
+        if quantity != _ZERO:
             item_data += f"*{quantity}"
 
         if price_modifier_type != PriceModifierType.NONE:
@@ -356,7 +312,7 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
             ):
                 value = -value
 
-            item_data += f"{sep}{value:.2f}"
+            item_data += f"{sep}{value.quantize(_Q2)}"
 
         resp, status, _ = self._isl_request(self.CMD_FISCAL_RECEIPT_SALE_DEPARTMENT, item_data)
         return resp, status
@@ -433,36 +389,22 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
         )
         return info
 
-    def get_payment_type_mappings(self) -> Dict[PaymentType, str]:
+    def get_payment_type_mappings(self) -> Mapping[PaymentType, str]:
         """
         Аналог на C# GetPaymentTypeMappings:
         Cash -> P, Card -> C, Check -> N, Reserved1 -> D
         """
-        return {
-            PaymentType.CASH: "P",
-            PaymentType.CARD: "C",
-            PaymentType.CHECK: "N",
-            PaymentType.RESERVED1: "D",
-        }
+        return self._PAYMENT_TYPE_MAP
 
     def get_tax_group_text(self, tax_group: TaxGroup) -> str:
         """
         Daisy използва стандартните А-З групи в ISL слой.
         Тук просто мапваме TaxGroup1..8 към А..З.
         """
-        mapping = {
-            TaxGroup.TaxGroup1: "А",
-            TaxGroup.TaxGroup2: "Б",
-            TaxGroup.TaxGroup3: "В",
-            TaxGroup.TaxGroup4: "Г",
-            TaxGroup.TaxGroup5: "Д",
-            TaxGroup.TaxGroup6: "Е",
-            TaxGroup.TaxGroup7: "Ж",
-            TaxGroup.TaxGroup8: "З",
-        }
-        if tax_group not in mapping:
-            raise ValueError(f"Unsupported tax group: {tax_group}")
-        return mapping[tax_group]
+        try:
+            return self._TAX_GROUP_MAP[tax_group]
+        except KeyError:
+            raise ValueError(f"Unsupported tax group: {tax_group}") from None
 
     def connect_and_probe(self, auto_detect: bool = True) -> DaisyDeviceInfo:
         """
@@ -489,7 +431,7 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
             _logger.warning("Daisy ISL: errors getting tax ID: %s", status_tax.errors)
         info.tax_identification_number = tax_id
 
-        info.supported_payment_types = self.get_payment_type_mappings()
+        info.supported_payment_types = dict(self.get_payment_type_mappings())
 
         self.info = info
         return info
@@ -553,6 +495,9 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
         (None, "", StatusMessageType.RESERVED),
     ]
 
+    # По байт: (маска на битовете с текст, {бит: (код, текст, тип)})
+    _STATUS_LOOKUP = _index_status_bits(STATUS_BITS_STRINGS)
+
     def parse_status(self, status_bytes: Optional[bytes]) -> DeviceStatus:
         """
         Парсване на статус байтове за Daisy (по C# BgDaisyIslFiscalPrinter.ParseStatus).
@@ -561,7 +506,8 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
         if status_bytes is None:
             return device_status
 
-        for i, b in enumerate(status_bytes):
+        table = self._STATUS_LOOKUP
+        for i, b in enumerate(status_bytes[:len(table)]):
             # Byte 3 – error code (bit0..bit6)
             if i == 3:
                 error_code = b & 0b01111111
@@ -571,20 +517,15 @@ class DaisyIslFiscalPrinterDriver(IslFiscalPrinterBase):
                     )
                 continue
 
-            mask = 0b10000000
-            for j in range(8):
-                if (mask & b) != 0:
-                    idx = i * 8 + (7 - j)
-                    if idx < len(self.STATUS_BITS_STRINGS):
-                        code, text, msg_type = self.STATUS_BITS_STRINGS[idx]
-                        if text:
-                            device_status.add_message(
-                                StatusMessage(
-                                    type=msg_type,
-                                    code=code,
-                                    text=text,
-                                )
-                            )
-                mask >>= 1
+            # Само вдигнатите битове с текст, от старшия към младшия
+            mask, entries = table[i]
+            b &= mask
+            while b:
+                bit = b.bit_length() - 1
+                code, text, msg_type = entries[bit]
+                device_status.add_message(
+                    StatusMessage(type=msg_type, code=code, text=text)
+                )
+                b ^= 1 << bit
 
         return device_status
@@ -10,21 +10,35 @@ Datecs ISL Fiscal Printer Driver
 - Datecs P/C (DP-25, DP-05, WP-50, DP-35)
 - Datecs X (FP-700X, WP-500X, DP-150X)
 - Datecs FP (FP-800, FP-2000, FP-650)
+
+Латентност при USB-serial адаптери (FTDI):
+драйверът на ядрото буферира входящите байтове до `latency_timer` ms
+(по подразбиране 16) преди да ги подаде нагоре. За ISL обмена това е
+~15ms на всяка заявка. На IoT box-а може да се намали с:
+
+    echo 1 > /sys/bus/usb-serial/devices/ttyUSB0/latency_timer
 """
 
+import codecs
 import logging
 import time
+from functools import lru_cache
+from itertools import count
 from threading import Lock
-from typing import Optional, Dict, Any, Tuple, List
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Tuple, List, Mapping
 from decimal import Decimal
 from abc import abstractmethod
 
 import serial
 
+from .serial_base_driver import SerialProtocol
 from .printer_driver_base_isl import (
     IslFiscalPrinterBase,
     IslDeviceInfo,
     DeviceStatus,
+    StatusMessage,
+    StatusMessageType,
     TaxGroup,
     PriceModifierType,
     PaymentType as IslPaymentType,
@@ -32,9 +46,55 @@ from .printer_driver_base_isl import (
 
 _logger = logging.getLogger(__name__)
 
+# cp1251 codec-ът се взима веднъж, вместо lookup в codec регистъра при всеки encode/decode
+_CP1251_ENCODE = codecs.lookup("cp1251").encode
+_CP1251_DECODE = codecs.lookup("cp1251").decode
+
+# Стъпки за quantize на суми (2 знака) и количества (3 знака) -
+# quantize + str е по-бързо от разбора на format spec при всеки f"{x:.2f}"
+_Q2 = Decimal("0.01")
+_Q3 = Decimal("0.001")
+_ONE = Decimal(1)
+
+
+@lru_cache(maxsize=256)
+def _encode_cp1251(text: str) -> bytes:
+    """
+    cp1251 encode с кеш - статус заявките, отчетите и операторските
+    параметри се повтарят при всяка заявка със същия текст.
+    """
+    return _CP1251_ENCODE(text)[0]
+
+
+class _HexDump:
+    """Мързелив hex dump - форматира се само ако логът наистина се записва."""
+
+    __slots__ = ("data",)
+
+    def __init__(self, data: Optional[bytes]):
+        self.data = data
+
+    def __str__(self):
+        return self.data.hex(" ") if self.data else "TIMEOUT"
+
 
 # ====================== БАЗОВ DATECS ISL ДРАЙВЕР ======================
 
+def _pack_status_bits(table):
+    """
+    (байт, маска, код, текст, тип) → ((бит в little-endian int, код, текст, тип), ...)
+    плюс общата маска на всички битове.
+    """
+    packed = tuple(
+        (mask << (8 * byte), code, text, msg_type)
+        for byte, mask, code, text, msg_type in table
+    )
+    mask = 0
+    for bit, *_rest in packed:
+        mask |= bit
+    return packed, mask
+
+
 class DatecsIslFiscalPrinterBase(IslFiscalPrinterBase):
     """
     Базов ISL драйвер за всички Datecs фискални принтери.
@@ -45,8 +105,8 @@ class DatecsIslFiscalPrinterBase(IslFiscalPrinterBase):
     - Общо парсване на статус байтове
 
     Конкретните версии (P/C, X, FP) наследяват и override-ват:
-    - detect_device() - различно парсване на device info
     - _parse_device_info() - различни формати на отговора
+    - _DETECT_INFO_DATA / _DETECT_STATUS_SIZES - параметри на общия detect_device()
     """
 
     connection_type = 'serial'
@@ -65,41 +125,79 @@ class DatecsIslFiscalPrinterBase(IslFiscalPrinterBase):
     MARKER_TERMINATOR = 0x03
 
     MAX_SEQUENCE_NUMBER = 0x7F - MARKER_SPACE
+    _TERMINATOR_BYTE = bytes((MARKER_TERMINATOR,))
+    # Готови еднобайтови bytes за SEQ - bytes((seq,)) строи tuple + bytes при всеки кадър
+    _SINGLE_BYTE = tuple(bytes((i,)) for i in range(256))
+
+    # BCC: байт → 2 ASCII nibble-а (0x30 + nibble, т.е. '0'..'9', ':'..'?').
+    # 256 записа вместо 65536 за цялата UInt16 стойност.
+    _BYTE_ASCII = tuple(bytes((0x30 + (i >> 4), 0x30 + (i & 0x0F))) for i in range(256))
     MAX_WRITE_RETRIES = 6
-    MAX_READ_RETRIES = 200
+
+    # Datecs отговаря (или праща SYN, ако е зает) до ~60 ms - тишина след
+    # това значи грешен baudrate или друго устройство
+    DETECT_FIRST_BYTE_TIMEOUT = 0.25
+
+    # Параметър на device info командата при детекция (FP v1 иска "*1")
+    _DETECT_INFO_DATA = b'1'
+    # Допустим брой статус байтове при детекция (празно = 6 или 8)
+    _DETECT_STATUS_SIZES: Tuple[int, ...] = ()
+
+    # Статус байтове според Datecs документацията:
+    # (байт, маска, код, текст, тип) - байт 3 и 5 нямат грешки/предупреждения
+    _STATUS_SIZE = 6
+    _STATUS_BITS, _STATUS_MASK = _pack_status_bits((
+        (0, 0x01, "E401", "Syntax error in the received data", StatusMessageType.ERROR),
+        (0, 0x02, "E402", "Invalid command code received", StatusMessageType.ERROR),
+        (0, 0x04, "E103", "The clock is not set", StatusMessageType.ERROR),
+        (0, 0x20, "E199", "General error", StatusMessageType.ERROR),
+        (0, 0x40, "E302", "The printer cover is open", StatusMessageType.ERROR),
+        (1, 0x01, "E403", "The command resulted in an overflow of some amount fields", StatusMessageType.ERROR),
+        (1, 0x02, "E404", "The command is not allowed in the current fiscal mode", StatusMessageType.ERROR),
+        (2, 0x01, "E301", "No paper", StatusMessageType.ERROR),
+        (2, 0x04, "E206", "End of the EJ", StatusMessageType.ERROR),
+        (2, 0x10, "W202", "The end of the EJ is near", StatusMessageType.WARNING),
+        (4, 0x01, "E202", "Fiscal memory store error", StatusMessageType.ERROR),
+        (4, 0x08, "W201", "There is space for less than 50 records remaining in the FP", StatusMessageType.WARNING),
+        (4, 0x10, "E201", "The fiscal memory is full", StatusMessageType.ERROR),
+        (4, 0x20, "E299", "FM general error", StatusMessageType.ERROR),
+        (4, 0x40, "E304", "The printing head is overheated", StatusMessageType.ERROR),
+    ))
+
+    # Адаптивен read timeout - EMA на времето до първия байт от отговора
+    RTT_EMA_ALPHA = 0.2
+    RTT_EMA_INITIAL = 0.05
+    MIN_READ_TIMEOUT = 0.02
+    MAX_READ_TIMEOUT = 2.0  # максимално мълчание на устройството
+    # Горна граница за отговор на един опит - SYN ("зает") удължава
+    # мълчанието, но не и това време
+    MAX_RESPONSE_TIME = 45.0
+
+    _protocol = SerialProtocol(
+        name="Datecs ISL",
+        baudrate=38400,  # default за повечето Datecs
+        bytesize=serial.EIGHTBITS,
+        stopbits=serial.STOPBITS_ONE,
+        parity=serial.PARITY_NONE,
+        timeout=1,
+        writeTimeout=1,
+        measureRegexp=None,
+        statusRegexp=None,
+        commandTerminator=b"",
+        commandDelay=0.2,
+        measureDelay=0.5,
+        newMeasureDelay=0.2,
+        measureCommand=b"",
+        emptyAnswerValid=False,
+    )
+
+    # Default options (Operator 1/0000, Administrator 20/9999) идват от
+    # IslFiscalPrinterBase._DEFAULT_OPTIONS
 
     def __init__(self, identifier, device):
         # ВАЖНО: Трябва да се дефинира _protocol ПРЕДИ super().__init__
-        from collections import namedtuple
-
-        detected_baudrate = 38400  # default за повечето Datecs
-        if isinstance(device, dict):
-            detected_baudrate = device.get('detected_baudrate', 38400)
-
-        Protocol = namedtuple('Protocol', [
-            'name', 'baudrate', 'bytesize', 'stopbits', 'parity',
-            'timeout', 'writeTimeout', 'measureRegexp', 'statusRegexp',
-            'commandTerminator', 'commandDelay', 'measureDelay',
-            'newMeasureDelay', 'measureCommand', 'emptyAnswerValid'
-        ])
-
-        self._protocol = Protocol(
-            name="Datecs ISL",
-            baudrate=detected_baudrate,
-            bytesize=serial.EIGHTBITS,
-            stopbits=serial.STOPBITS_ONE,
-            parity=serial.PARITY_NONE,
-            timeout=1,
-            writeTimeout=1,
-            measureRegexp=None,
-            statusRegexp=None,
-            commandTerminator=b"",
-            commandDelay=0.2,
-            measureDelay=0.5,
-            newMeasureDelay=0.2,
-            measureCommand=b"",
-            emptyAnswerValid=False,
-        )
+        if isinstance(device, dict) and device.get('detected_baudrate'):
+            self._protocol = self._protocol._replace(baudrate=device['detected_baudrate'])
 
         super().__init__(identifier, device)
 
@@ -113,51 +211,50 @@ class DatecsIslFiscalPrinterBase(IslFiscalPrinterBase):
             operator_password_max_length=8,
         )
 
-        # Default options
-        self.options.update({
-            "Operator.ID": "1",
-            "Operator.Password": "0000",
-            "Administrator.ID": "20",
-            "Administrator.Password": "9999",
-        })
-
-        self._frame_sequence_number = 0
+        # next() върху itertools.count е атомарен в CPython - броячът не
+        # изисква _frame_lock, който пази само самия write/read обмен
+        self._frame_sequence_counter = count(1)
         self._frame_lock = Lock()
+        self._rtt_ema = self.RTT_EMA_INITIAL
 
         # Регистрация на POS действия
-        self._actions.update({
-            "pos_print_receipt": self._action_pos_print_receipt,
-            "pos_print_reversal_receipt": self._action_pos_print_reversal_receipt,
-            "pos_deposit_money": self._action_pos_deposit_money,
-            "pos_withdraw_money": self._action_pos_withdraw_money,
-            "pos_x_report": self._action_pos_x_report,
-            "pos_z_report": self._action_pos_z_report,
-            "pos_print_duplicate": self._action_pos_print_duplicate,
-        })
+        self._register_pos_actions()
 
     # ====================== ОБЩИ МЕТОДИ ЗА ВСИЧКИ DATECS ======================
 
-    @staticmethod
-    def _build_detection_message(cmd: int, data: bytes, seq: int) -> bytes:
-        """Сглобява ISL съобщение за детекция."""
-        PRE = 0x01
-        PST = 0x05
-        ETX = 0x03
-        SPACE = 0x20
-
-        length = SPACE + 4 + len(data)
-        core = bytes([length, seq, cmd]) + data + bytes([PST])
-
-        # Checksum
-        checksum = sum(core) & 0xFFFF
-        cs_bytes = bytes([
-            ((checksum >> 12) & 0x0F) + 0x30,
-            ((checksum >> 8) & 0x0F) + 0x30,
-            ((checksum >> 4) & 0x0F) + 0x30,
-            (checksum & 0x0F) + 0x30,
-        ])
-
-        return bytes([PRE]) + core + cs_bytes + bytes([ETX])
+    def __init_subclass__(cls, **kwargs):
+        """
+        Детекционните кадри са константи (фиксирани SEQ 0x20/0x21) -
+        сглобяват се веднъж за всеки драйвер, а не при всяка проба
+        на всеки baudrate.
+        """
+        super().__init_subclass__(**kwargs)
+        cls._DETECT_STATUS_FRAME = cls._build_detection_message(cls.CMD_GET_STATUS, b'', 0x20)
+        cls._DETECT_INFO_FRAME = cls._build_detection_message(
+            cls.CMD_GET_DEVICE_INFO, cls._DETECT_INFO_DATA, 0x21
+        )
+
+    @classmethod
+    def _build_detection_message(cls, cmd: int, data: bytes, seq: int) -> bytes:
+        """Сглобява ISL съобщение за детекция (seq е готовият SEQ байт)."""
+        head, tail, partial_sum = cls._frame_template(cmd, data)
+        return b"".join((
+            head,
+            cls._SINGLE_BYTE[seq],
+            tail,
+            cls._uint16_to_4bytes((partial_sum + seq) & 0xFFFF),
+            cls._TERMINATOR_BYTE,
+        ))
+
+    @classmethod
+    def _read_frame_until_term(
+            cls,
+            connection,
+            timeout_s: float = 0.5,
+            first_byte_s: Optional[float] = None,
+    ) -> bytes:
+        """Чете от connection до ETX или до изтичане на timeout_s (виж _read_until_byte)."""
+        return cls._read_until_byte(connection, cls.MARKER_TERMINATOR, timeout_s, first_byte_s)
 
     @staticmethod
     def _validate_checksum(response: bytes) -> bool:
@@ -165,17 +262,111 @@ class DatecsIslFiscalPrinterBase(IslFiscalPrinterBase):
         if len(response) < 10:
             return False
 
-        if response[-1:] != bytes([0x03]):  # ETX
+        if response[-1] != 0x03:  # ETX
             return False
 
+        # BCC е 4 байта 0x30 + nibble (над 9 дава ':;<=>?', не 'a-f'),
+        # затова не се чете с int(..., 16)
+        bcc_received = (
+            ((response[-5] - 0x30) << 12)
+            | ((response[-4] - 0x30) << 8)
+            | ((response[-3] - 0x30) << 4)
+            | (response[-2] - 0x30)
+        )
+        return bcc_received == sum(response[1:-5]) & 0xFFFF
+
+    @classmethod
+    def _status_frame_size(cls, response: bytes) -> int:
+        """
+        Евтина проверка на формата на отговора преди _validate_checksum.
+
+        Кадърът завършва с <SEP><STATUS(6|8)><PST><BCC(4)><ETX> - проверяваме
+        само фиксираните позиции, без да обхождаме байтовете. Връща броя
+        статус байтове (6 или 8) или 0, ако формата не съвпада. Статус
+        байтовете винаги са с вдигнат бит 7, така че не се бъркат със SEP.
+        """
+        # PRE LEN SEQ CMD + SEP + 6 статус байта + PST + BCC + ETX = 17
+        if len(response) < 17:
+            return 0
+        if response[-1] != cls.MARKER_TERMINATOR or response[-6] != cls.MARKER_POSTAMBLE:
+            return 0
+        if response[-13] == cls.MARKER_SEPARATOR:
+            return 6
+        if len(response) >= 19 and response[-15] == cls.MARKER_SEPARATOR:
+            return 8
+        return 0
+
+    @classmethod
+    def detect_device(cls, connection, baudrate: int) -> Optional[Dict[str, Any]]:
+        """
+        Детекция на Datecs устройство на ОТВОРЕНА connection.
+
+        ВАЖНО:
+        - connection е ВЕЧЕ отворена на baudrate
+        - НЕ променяме baudrate-а
+        - НЕ затваряме connection-а
+
+        Общ ред за всички Datecs протоколи: STATUS → проверка на кадъра →
+        device info → _parse_device_info на конкретния клас. Протоколите се
+        различават само по _DETECT_INFO_DATA, _DETECT_STATUS_SIZES и парсера.
+        """
+        _logger.debug(f"🔍 {cls.__name__} DETECTION at {baudrate} baud")
+
         try:
-            bcc_hex = response[-5:-1]
-            bcc_received = int(bcc_hex, 16)
-            message_part = response[1:-5]
-            bcc_calculated = sum(message_part) & 0xFFFF
-            return bcc_received == bcc_calculated
-        except Exception:
-            return False
+            # ISL STATUS команда
+            message = cls._DETECT_STATUS_FRAME
+
+            _logger.debug("   📤 TX: %s", _HexDump(message))
+            connection.write(message)
+            connection.flush()
+
+            response = cls._read_frame_until_term(
+                connection, timeout_s=1.5, first_byte_s=cls.DETECT_FIRST_BYTE_TIMEOUT
+            )
+            _logger.debug("   📥 RX (%d bytes): %s", len(response), _HexDump(response))
+
+            if not response or response[0] != cls.MARKER_PREAMBLE:
+                return None
+
+            # Формата на кадъра е по-евтин от checksum-а - при грешен
+            # baudrate/протокол отпадаме тук, без да сумираме байтовете
+            status_size = cls._status_frame_size(response)
+            if not status_size:
+                return None
+
+            if cls._DETECT_STATUS_SIZES and status_size not in cls._DETECT_STATUS_SIZES:
+                _logger.debug("   ⚠️ %d-byte status, not %s", status_size, cls.__name__)
+                return None
+
+            if not cls._validate_checksum(response):
+                return None
+
+            _logger.debug("   ✅ Valid ISL response (%d status bytes)", status_size)
+
+            # Отговорът е прочетен до ETX - изчистваме само евентуални остатъци
+            connection.reset_input_buffer()
+
+            # Device info
+            info_msg = cls._DETECT_INFO_FRAME
+            _logger.debug("   📤 TX (device info): %s", _HexDump(info_msg))
+            connection.write(info_msg)
+            connection.flush()
+
+            info_resp = cls._read_frame_until_term(connection, timeout_s=2.3)
+            _logger.debug("   📥 RX (device info, %d bytes)", len(info_resp))
+
+            if info_resp and len(info_resp) > 20:
+                device_info = cls._parse_device_info(info_resp)
+                if device_info:
+                    _logger.info(f"   ✅ DETECTED: {device_info.get('model')} ({cls.__name__})")  # INFO само при успех
+                    _logger.info(f"   📋 Protocol: {device_info.get('protocol_name')}")
+                    return device_info
+
+            return None
+
+        except Exception as e:
+            _logger.debug(f"   ⚠️ Exception: {e}", exc_info=True)
+            return None
 
     @staticmethod
     @abstractmethod
@@ -190,129 +381,231 @@ class DatecsIslFiscalPrinterBase(IslFiscalPrinterBase):
         """
         raise NotImplementedError
 
-    def _uint16_to_4bytes(self, word: int) -> bytes:
+    @classmethod
+    def _uint16_to_4bytes(cls, word: int) -> bytes:
         """UInt16 → 4 ASCII цифри."""
-        return bytes([
-            ((word >> 12) & 0x0F) + 0x30,
-            ((word >> 8) & 0x0F) + 0x30,
-            ((word >> 4) & 0x0F) + 0x30,
-            (word & 0x0F) + 0x30,
-        ])
-
-    def _compute_bcc(self, fragment: bytes) -> bytes:
-        """BCC - сума на байтовете като 4 ASCII цифри."""
-        bcc_sum = sum(fragment) & 0xFFFF
-        return self._uint16_to_4bytes(bcc_sum)
+        return cls._BYTE_ASCII[(word >> 8) & 0xFF] + cls._BYTE_ASCII[word & 0xFF]
+
+    def _next_sequence_number(self) -> int:
+        """Следващ SEQ (1..MAX_SEQUENCE_NUMBER, 0, 1, ... циклично)."""
+        return next(self._frame_sequence_counter) % (self.MAX_SEQUENCE_NUMBER + 1)
+
+    @classmethod
+    @lru_cache(maxsize=64)
+    def _frame_template(cls, command: int, data: bytes) -> Tuple[bytes, bytes, int]:
+        """
+        Постоянните части на кадъра за (command, data) - всичко освен SEQ.
+
+        Връща (PRE LEN, CMD DATA PST, сумата на LEN + CMD DATA PST), така че
+        статус заявките и отчетите не сумират отново едни и същи байтове.
+        sum() върху bytes е най-бързият наличен път - memoryview или SWAR
+        на чист Python са по-бавни.
+        """
+        head = bytes((cls.MARKER_PREAMBLE, cls.MARKER_SPACE + 4 + len(data)))
+        tail = bytes((command & 0xFF,)) + data + bytes((cls.MARKER_POSTAMBLE,))
+        return head, tail, head[1] + sum(tail)
 
     def _build_host_frame(self, command: int, data: Optional[bytes]) -> bytes:
-        """Изгражда ISL кадър."""
-        if data is None:
-            data = b""
+        """
+        Изгражда ISL кадър: PRE LEN SEQ CMD DATA PST BCC(4) ETX.
 
-        frame = bytearray()
-        frame.append(self.MARKER_PREAMBLE)
+        Само SEQ се мени между заявките - BCC е сумата от кеширания шаблон
+        плюс SEQ байта.
+        """
+        head, tail, partial_sum = self._frame_template(command, data or b"")
+        seq = self.MARKER_SPACE + self._next_sequence_number()
+        return b"".join((
+            head,
+            self._SINGLE_BYTE[seq],
+            tail,
+            self._uint16_to_4bytes((partial_sum + seq) & 0xFFFF),
+            self._TERMINATOR_BYTE,
+        ))
+
+    def _adapt_read_timeout(self, measured: Optional[float] = None):
+        """
+        Обновява EMA на латентността и нагласява read timeout-а на порта.
 
-        length = self.MARKER_SPACE + 4 + len(data)
-        frame.append(length)
+        Устройство, което отговаря за 50ms, не трябва да се чака 1s при
+        всяко празно четене, а бавно устройство не трябва да се "поллва"
+        излишно - timeout-ът следва 3x средната латентност.
+        """
+        if measured is not None:
+            alpha = self.RTT_EMA_ALPHA
+            self._rtt_ema = alpha * measured + (1 - alpha) * self._rtt_ema
 
-        self._frame_sequence_number += 1
-        if self._frame_sequence_number > self.MAX_SEQUENCE_NUMBER:
-            self._frame_sequence_number = 0
-        frame.append(self.MARKER_SPACE + self._frame_sequence_number)
+        timeout = round(min(self.MAX_READ_TIMEOUT, max(self.MIN_READ_TIMEOUT, 3 * self._rtt_ema)), 2)
+        if self._connection.timeout != timeout:
+            self._connection.timeout = timeout
 
-        frame.append(command & 0xFF)
-        frame.extend(data)
-        frame.append(self.MARKER_POSTAMBLE)
-        frame.extend(self._compute_bcc(frame[1:]))
-        frame.append(self.MARKER_TERMINATOR)
+    def _find_control_byte(self, buf: bytearray, start: int) -> int:
+        """
+        Първата позиция на NAK/SYN/TERMINATOR в buf[start:] или -1.
 
-        return bytes(frame)
+        Всяко следващо find() търси само до най-ранната вече намерена
+        позиция - без списък с кандидати при всяко сканиране.
+        """
+        find = buf.find
+        end = len(buf)
+        first = find(self.MARKER_TERMINATOR, start, end)
+        if first >= 0:
+            end = first
+        pos = find(self.MARKER_NAK, start, end)
+        if pos >= 0:
+            first = end = pos
+        pos = find(self.MARKER_SYN, start, end)
+        if pos >= 0:
+            first = pos
+        return first
+
+    def _raw_request(self, command: int, data: Optional[bytes]) -> Optional[bytearray]:
+        """
+        Изпраща ISL кадър и връща отговора.
 
-    def _raw_request(self, command: int, data: Optional[bytes]) -> Optional[bytes]:
-        """Изпраща ISL кадър и връща отговора."""
+        Връща вътрешния буфер без копие - консумира се еднократно
+        от _parse_response_frame.
+        """
         if data is None:
             data = b""
 
+        request = self._build_host_frame(command, data)
+
         with self._frame_lock:
-            request = self._build_host_frame(command, data)
+            current = bytearray()
+
+            # Локални референции за горещия цикъл (LOAD_FAST вместо LOAD_ATTR)
+            conn = self._connection
+            PRE, TERM = self.MARKER_PREAMBLE, self.MARKER_TERMINATOR
+            frame_overhead = 6 - self.MARKER_SPACE  # размер = LEN - 0x20 + PST/BCC/ETX
+            find_control_byte = self._find_control_byte
+            max_silence = self.MAX_READ_TIMEOUT
+            max_response = self.MAX_RESPONSE_TIME
+            monotonic = time.monotonic
+            debug = _logger.debug if _logger.isEnabledFor(logging.DEBUG) else None
+
+            if not conn or not conn.is_open:
+                _logger.error("Datecs ISL: not connected")
+                return None
+            read_chunk = self._chunk_reader(conn)
 
             for _w in range(self.MAX_WRITE_RETRIES):
-                if not self._connection or not self._connection.is_open:
+                if not conn.is_open:
                     _logger.error("Datecs ISL: not connected")
                     return None
 
-                _logger.debug("Datecs ISL <<< %s", request.hex(" "))
+                if debug:
+                    debug("Datecs ISL <<< %s", request.hex(" "))
+                # Целият кадър с един write(); без flush() - на Linux той е
+                # tcdrain() и блокира до физическото изпращане, а следващият
+                # read() така или иначе чака отговора.
                 try:
-                    self._connection.write(request)
-                    self._connection.flush()
+                    self._adapt_read_timeout()
+                    conn.write(request)
                 except Exception as e:
                     _logger.exception("Datecs ISL: write error: %s", e)
                     raise
 
-                # Read loop
-                current = bytearray()
-                for _r in range(self.MAX_READ_RETRIES):
+                # Read loop - без sleep: ако има чакащи байтове ги взимаме
+                # веднага, иначе read_chunk() блокира до първия байт или timeout-а.
+                # След PRE + LEN се иска наведнъж остатъкът от кадъра.
+                # (read(256) би чакал целия timeout за кадър под 256 байта.)
+                # Всеки получен байт (вкл. SYN) удължава крайния срок за
+                # мълчание, а целият опит е ограничен от MAX_RESPONSE_TIME.
+                sent_at = monotonic()
+                deadline = sent_at + max_silence
+                hard_deadline = sent_at + max_response
+                first_byte_at = None
+                current.clear()
+                want = 1
+                while True:
                     try:
-                        buf = self._connection.read(256)
+                        buf = read_chunk(want)
                     except Exception as e:
                         _logger.exception("Datecs ISL: read error: %s", e)
                         return None
 
+                    now = monotonic()
+                    if now > hard_deadline:
+                        _logger.warning("Datecs ISL: no complete response within %.0f s", max_response)
+                        break
                     if not buf:
-                        time.sleep(0.01)
+                        if now > deadline:
+                            break
                         continue
 
-                    _logger.debug("Datecs ISL >>> %s", buf.hex(" "))
+                    if first_byte_at is None:
+                        first_byte_at = now
+                    deadline = now + max_silence
 
-                    for b in buf:
-                        current.append(b)
-                        if b in (self.MARKER_NAK, self.MARKER_SYN, self.MARKER_TERMINATOR):
-                            if current[0] == self.MARKER_PREAMBLE:
-                                return bytes(current)
-                            if b == self.MARKER_NAK:
-                                current.clear()
-                                break
-                            if b == self.MARKER_SYN:
-                                current.clear()
-                                break
+                    if debug:
+                        debug("Datecs ISL >>> %s", buf.hex(" "))
+
+                    scan_from = len(current)
+                    current.extend(buf)
+                    while True:
+                        idx = find_control_byte(current, scan_from)
+                        if idx < 0:
+                            break
+                        if current[0] == PRE:
+                            del current[idx + 1:]
+                            self._adapt_read_timeout(first_byte_at - sent_at)
+                            return current
+                        if current[idx] == TERM:
+                            scan_from = idx + 1
+                            continue
+                        # NAK/SYN - изхвърляме всичко до тях включително
+                        del current[:idx + 1]
+                        scan_from = 0
+
+                    # LEN (отместване 1) дава дължината на целия кадър -
+                    # следващото четене иска точно остатъка
+                    if len(current) > 1 and current[0] == PRE:
+                        want = max(current[1] + frame_overhead - len(current), 1)
+                    else:
+                        want = 1
 
             return None
 
-    def _parse_response_frame(self, raw: Optional[bytes]) -> Tuple[str, bytes]:
+    def _parse_response_frame(self, raw: Optional[bytearray]) -> Tuple[str, bytes]:
         """Парсва ISL отговор."""
         if raw is None:
             raise RuntimeError("no response from device")
 
-        preamble_pos = separator_pos = postamble_pos = terminator_pos = None
-        for i, b in enumerate(raw):
-            if b == self.MARKER_PREAMBLE:
-                preamble_pos = i
-            elif b == self.MARKER_SEPARATOR:
-                separator_pos = i
-            elif b == self.MARKER_POSTAMBLE:
-                postamble_pos = i
-            elif b == self.MARKER_TERMINATOR:
-                terminator_pos = i
-
-        if (preamble_pos is None or separator_pos is None or
-                postamble_pos is None or terminator_pos is None or
+        size = len(raw)
+        postamble_pos = size - 6
+        if (size >= 10 and raw[0] == self.MARKER_PREAMBLE
+                and raw[-1] == self.MARKER_TERMINATOR
+                and raw[1] - self.MARKER_SPACE == postamble_pos
+                and raw[postamble_pos] == self.MARKER_POSTAMBLE):
+            # Бърз път: _raw_request връща кадъра изрязан от PRE до ETX, а LEN
+            # дава директно позицията на POSTAMBLE - търси се само SEPARATOR
+            preamble_pos = 0
+            terminator_pos = size - 1
+            separator_pos = raw.rfind(self.MARKER_SEPARATOR, 4, postamble_pos)
+        else:
+            # Последните позиции на маркерите (rfind = memchr отзад, без Python цикъл)
+            preamble_pos = raw.rfind(self.MARKER_PREAMBLE)
+            separator_pos = raw.rfind(self.MARKER_SEPARATOR)
+            postamble_pos = raw.rfind(self.MARKER_POSTAMBLE)
+            terminator_pos = raw.rfind(self.MARKER_TERMINATOR)
+
+        if (preamble_pos < 0 or
                 not (preamble_pos + 4 <= separator_pos < postamble_pos < terminator_pos)):
             raise RuntimeError("invalid ISL response frame")
 
-        data = raw[preamble_pos + 4: separator_pos]
-        status_bytes = raw[separator_pos + 1: postamble_pos]
-
-        try:
-            resp_str = data.decode("cp1251", errors="ignore")
-        except Exception:
-            resp_str = ""
+        with memoryview(raw) as mv:
+            status_bytes = mv[separator_pos + 1: postamble_pos].tobytes()
+            try:
+                resp_str = _CP1251_DECODE(mv[preamble_pos + 4: separator_pos], "ignore")[0]
+            except Exception:
+                resp_str = ""
 
         return resp_str, status_bytes
 
     def _isl_request(self, command: int, data: str = "") -> Tuple[str, DeviceStatus, bytes]:
         """Реалният ISL request за Datecs."""
         try:
-            raw = self._raw_request(command, data.encode("cp1251") if data else None)
+            raw = self._raw_request(command, _encode_cp1251(data) if data else None)
         except Exception as e:
             _logger.exception("Datecs ISL: error during _isl_request for cmd=0x%02X", command)
             status = DeviceStatus()
@@ -333,147 +626,62 @@ class DatecsIslFiscalPrinterBase(IslFiscalPrinterBase):
             return "", status, b""
 
         status = self._parse_datecs_status(status_bytes)
-        return resp_str, status, bytes(status_bytes)
+        return resp_str, status, status_bytes
 
     def _parse_datecs_status(self, status_bytes: bytes) -> DeviceStatus:
-        """Парсва статус байтовете според Datecs документацията."""
+        """Парсва статус байтовете според таблицата _STATUS_BITS на модела."""
         status = DeviceStatus()
 
-        if not status_bytes or len(status_bytes) < 6:
+        if not status_bytes or len(status_bytes) < self._STATUS_SIZE:
             return status
 
-        # Byte 0 - Syntax & Communication errors
-        if status_bytes[0] & 0x01:
-            status.add_error("E401", "Syntax error in the received data")
-        if status_bytes[0] & 0x02:
-            status.add_error("E402", "Invalid command code received")
-        if status_bytes[0] & 0x04:
-            status.add_error("E103", "The clock is not set")
-        if status_bytes[0] & 0x20:
-            status.add_error("E199", "General error")
-        if status_bytes[0] & 0x40:
-            status.add_error("E302", "The printer cover is open")
-
-        # Byte 1 - Command execution errors
-        if status_bytes[1] & 0x01:
-            status.add_error("E403", "The command resulted in an overflow of some amount fields")
-        if status_bytes[1] & 0x02:
-            status.add_error("E404", "The command is not allowed in the current fiscal mode")
-
-        # Byte 2 - Paper & Receipt status
-        if status_bytes[2] & 0x01:
-            status.add_error("E301", "No paper")
-        if status_bytes[2] & 0x04:
-            status.add_error("E206", "End of the EJ")
-        if status_bytes[2] & 0x10:
-            from .printer_driver_base_isl import StatusMessage, StatusMessageType
-            status.add_message(StatusMessage(
-                type=StatusMessageType.WARNING,
-                code="W202",
-                text="The end of the EJ is near"
-            ))
-
-        # Byte 4 - Fiscal memory status
-        if status_bytes[4] & 0x01:
-            status.add_error("E202", "Fiscal memory store error")
-        if status_bytes[4] & 0x08:
-            from .printer_driver_base_isl import StatusMessage, StatusMessageType
-            status.add_message(StatusMessage(
-                type=StatusMessageType.WARNING,
-                code="W201",
-                text="There is space for less than 50 records remaining in the FP"
-            ))
-        if status_bytes[4] & 0x10:
-            status.add_error("E201", "The fiscal memory is full")
-        if status_bytes[4] & 0x20:
-            status.add_error("E299", "FM general error")
-        if status_bytes[4] & 0x40:
-            status.add_error("E304", "The printing head is overheated")
+        # Всички статус байтове в едно int - при OK статус (само 0x80
+        # битовете) таблицата изобщо не се обхожда
+        bits = int.from_bytes(status_bytes[:self._STATUS_SIZE], "little")
+        if not bits & self._STATUS_MASK:
+            return status
+
+        for bit, code, text, msg_type in self._STATUS_BITS:
+            if bits & bit:
+                status.add_message(StatusMessage(type=msg_type, code=code, text=text))
 
         return status
 
     # ====================== TAX GROUPS / PAYMENTS ======================
 
+    # Datecs ISL използва български А..З данъчни групи
+    _TAX_GROUP_MAP = {
+        TaxGroup.TaxGroup1: "А",
+        TaxGroup.TaxGroup2: "Б",
+        TaxGroup.TaxGroup3: "В",
+        TaxGroup.TaxGroup4: "Г",
+        TaxGroup.TaxGroup5: "Д",
+        TaxGroup.TaxGroup6: "Е",
+        TaxGroup.TaxGroup7: "Ж",
+        TaxGroup.TaxGroup8: "З",
+    }
+
+    # Базов Datecs ISL mapping на плащанията
+    _PAYMENT_TYPE_MAP = MappingProxyType({
+        IslPaymentType.CASH: "P",
+        IslPaymentType.CARD: "C",
+        IslPaymentType.CHECK: "N",
+        IslPaymentType.RESERVED1: "D",
+    })
+
     def get_tax_group_text(self, tax_group: TaxGroup) -> str:
         """Datecs ISL използва български А..З данъчни групи."""
-        mapping = {
-            TaxGroup.TaxGroup1: "А",
-            TaxGroup.TaxGroup2: "Б",
-            TaxGroup.TaxGroup3: "В",
-            TaxGroup.TaxGroup4: "Г",
-            TaxGroup.TaxGroup5: "Д",
-            TaxGroup.TaxGroup6: "Е",
-            TaxGroup.TaxGroup7: "Ж",
-            TaxGroup.TaxGroup8: "З",
-        }
-        if tax_group not in mapping:
-            raise ValueError(f"Unsupported tax group for Datecs ISL: {tax_group}")
-        return mapping[tax_group]
-
-    def get_payment_type_mappings(self) -> Dict[IslPaymentType, str]:
+        try:
+            return self._TAX_GROUP_MAP[tax_group]
+        except KeyError:
+            raise ValueError(f"Unsupported tax group for Datecs ISL: {tax_group}") from None
+
+    def get_payment_type_mappings(self) -> Mapping[IslPaymentType, str]:
         """Базов Datecs ISL mapping."""
-        return {
-            IslPaymentType.CASH: "P",
-            IslPaymentType.CARD: "C",
-            IslPaymentType.CHECK: "N",
-            IslPaymentType.RESERVED1: "D",
-        }
+        return self._PAYMENT_TYPE_MAP
 
     # ====================== POS ACTIONS ======================
 
-    def _action_pos_print_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_reversal_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_reversal_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_deposit_money(self, data: dict):
-        status = self.pos_deposit_money(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_withdraw_money(self, data: dict):
-        status = self.pos_withdraw_money(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_x_report(self, data: dict):
-        status = self.pos_x_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_z_report(self, data: dict):
-        status = self.pos_z_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_duplicate(self, data: dict):
-        status = self.pos_print_duplicate(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
     @classmethod
     def supported(cls, device):
         """
@@ -519,6 +727,10 @@ class DatecsIslFiscalPrinterBase(IslFiscalPrinterBase):
             _logger.info(f"❌ {cls.__name__}: Not a serial port: {port}")
             return False
 
+        if cls._detection_failed_recently(port):
+            _logger.info(f"⏭️ {cls.__name__}: Detection failed recently on {port} - skipping")
+            return False
+
         _logger.info(f"✅ {cls.__name__}: Valid serial port: {port}")
         _logger.info(f"✅ {cls.__name__}: Will attempt detection in __init__")
         _logger.info("=" * 80)
@@ -544,102 +756,23 @@ class DatecsPCIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         """Override - Datecs P/C приоритизация."""
         return [115200, 38400, 9600, 19200]
 
-    @classmethod
-    def detect_device(cls, connection, baudrate: int) -> Optional[Dict[str, Any]]:
-        """
-        Детекция на Datecs P/C устройство на ОТВОРЕНА connection.
-
-        ВАЖНО:
-        - connection е ВЕЧЕ отворена на baudrate
-        - НЕ променяме baudrate-а
-        - НЕ затваряме connection-а
-        """
-        _logger.debug(f"🔍 {cls.__name__} DETECTION at {baudrate} baud")
-
-        try:
-            # ISL STATUS команда
-            seq = 0x20
-            message = cls._build_detection_message(cls.CMD_GET_STATUS, b'', seq)
-
-            _logger.debug(f"   📤 TX: {message.hex(' ')}")
-            connection.write(message)
-            connection.flush()
-
-            time.sleep(0.5)
-
-            response = connection.read(256)
-            _logger.debug(f"   📥 RX ({len(response)} bytes): {response.hex(' ') if response else 'TIMEOUT'}")
-
-            if not response or len(response) < 10:
-                return None
-
-            if response[0:1] != bytes([cls.MARKER_PREAMBLE]):
-                return None
-
-            if not cls._validate_checksum(response):
-                return None
-
-            _logger.debug(f"   ✅ Valid ISL response!")
-
-            # Изчакай устройството
-            connection.reset_input_buffer()
-            time.sleep(0.3)
-
-            # Device info със параметър "1"
-            info_msg = cls._build_detection_message(cls.CMD_GET_DEVICE_INFO, b'1', seq + 1)
-            _logger.info(f"   📤 TX (device info): {info_msg.hex(' ')}")
-            connection.write(info_msg)
-            connection.flush()
-
-            time.sleep(0.8)
-
-            info_resp = bytearray()
-            start_time = time.time()
-            while time.time() - start_time < 1.5:
-                if connection.in_waiting > 0:
-                    chunk = connection.read(connection.in_waiting)
-                    info_resp.extend(chunk)
-                    time.sleep(0.05)
-                else:
-                    if len(info_resp) > 0:
-                        time.sleep(0.2)
-                        if connection.in_waiting == 0:
-                            break
-                    else:
-                        time.sleep(0.05)
-
-            info_resp = bytes(info_resp)
-            _logger.info(f"   📥 RX (device info, {len(info_resp)} bytes)")
-
-            if info_resp and len(info_resp) > 20:
-                device_info = cls._parse_device_info(info_resp)
-                if device_info:
-                    _logger.info(f"   ✅ DETECTED: {device_info.get('model')} ({cls.__name__})")  # INFO само при успех
-                    _logger.info(f"   📋 Protocol: {device_info.get('protocol_name')}")
-                    return device_info
-
-            return None  # или fallback
-
-        except Exception as e:
-            _logger.debug(f"   ⚠️ Exception: {e}")
-            return None
-
     @staticmethod
     def _parse_device_info(response: bytes) -> Optional[Dict[str, Any]]:
         """Парсва Datecs P/C device info (6 полета със запетая)."""
         try:
-            _logger.info(f"   🔍 Parsing Datecs P/C device info from {len(response)} bytes")
+            _logger.debug("   🔍 Parsing Datecs P/C device info from %d bytes", len(response))
 
-            sep_pos = response.find(bytes([0x04]))  # SEPARATOR
+            sep_pos = response.find(0x04)  # SEPARATOR
             if sep_pos == -1 or sep_pos <= 4:
                 return None
 
             data = response[4:sep_pos]
-            data_str = data.decode('cp1251', errors='ignore')
-            _logger.info(f"   Data string: '{data_str}'")
+            data_str = _CP1251_DECODE(data, 'ignore')[0]
+            _logger.debug("   Data string: '%s'", data_str)
 
-            fields = data_str.split(',')
-            _logger.info(f"   Comma-separated fields: {len(fields)}")
+            # Ограничен split - останалата част от низа не се разделя излишно
+            fields = data_str.split(',', 6)
+            _logger.debug("   Comma-separated fields: %d", len(fields))
 
             if len(fields) >= 6:
                 _logger.info("   ✅ Detected Datecs P/C protocol (6 comma fields)")
@@ -686,102 +819,22 @@ class DatecsXIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         """Override - Datecs X приоритизация."""
         return [115200, 57600, 38400, 19200]
 
-    @classmethod
-    def detect_device(cls, connection, baudrate: int) -> Optional[Dict[str, Any]]:
-        """
-        Детекция на Datecs X устройство на ОТВОРЕНА connection.
-
-        ВАЖНО:
-        - connection е ВЕЧЕ отворена на baudrate
-        - НЕ променяме baudrate-а
-        - НЕ затваряме connection-а
-        """
-        _logger.debug(f"🔍 {cls.__name__} DETECTION at {baudrate} baud")
-
-        try:
-            # ISL STATUS команда
-            seq = 0x20
-            message = cls._build_detection_message(cls.CMD_GET_STATUS, b'', seq)
-
-            _logger.debug(f"   📤 TX: {message.hex(' ')}")
-            connection.write(message)
-            connection.flush()
-
-            time.sleep(0.5)
-
-            response = connection.read(256)
-            _logger.info(f"   📥 RX ({len(response)} bytes): {response.hex(' ') if response else 'TIMEOUT'}")
-
-            if not response or len(response) < 10:
-                return None
-
-            if response[0:1] != bytes([cls.MARKER_PREAMBLE]):
-                return None
-
-            if not cls._validate_checksum(response):
-                return None
-
-            _logger.debug(f"   ✅ Valid ISL response!")
-
-            # Изчакай устройството
-            connection.reset_input_buffer()
-            time.sleep(0.3)
-
-            # Device info със параметър "1"
-            info_msg = cls._build_detection_message(cls.CMD_GET_DEVICE_INFO, b'1', seq + 1)
-            _logger.info(f"   📤 TX (device info): {info_msg.hex(' ')}")
-            connection.write(info_msg)
-            connection.flush()
-
-            time.sleep(0.8)
-
-            info_resp = bytearray()
-            start_time = time.time()
-            while time.time() - start_time < 1.5:
-                if connection.in_waiting > 0:
-                    chunk = connection.read(connection.in_waiting)
-                    info_resp.extend(chunk)
-                    time.sleep(0.05)
-                else:
-                    if len(info_resp) > 0:
-                        time.sleep(0.2)
-                        if connection.in_waiting == 0:
-                            break
-                    else:
-                        time.sleep(0.05)
-
-            info_resp = bytes(info_resp)
-            _logger.info(f"   📥 RX (device info, {len(info_resp)} bytes)")
-
-            if info_resp and len(info_resp) > 20:
-                device_info = cls._parse_device_info(info_resp)
-                if device_info:
-                    _logger.info(f"   ✅ DETECTED: {device_info.get('model')} ({cls.__name__})")  # INFO само при успех
-                    _logger.info(f"   📋 Protocol: {device_info.get('protocol_name')}")
-                    return device_info
-
-            return None
-
-        except Exception as e:
-            _logger.error(f"   ⚠️ Exception: {e}", exc_info=True)
-            return None
-
     @staticmethod
     def _parse_device_info(response: bytes) -> Optional[Dict[str, Any]]:
         """Парсва Datecs X device info (8 полета с табулация)."""
         try:
-            _logger.info(f"   🔍 Parsing Datecs X device info from {len(response)} bytes")
+            _logger.debug("   🔍 Parsing Datecs X device info from %d bytes", len(response))
 
-            sep_pos = response.find(bytes([0x04]))  # SEPARATOR
+            sep_pos = response.find(0x04)  # SEPARATOR
             if sep_pos == -1 or sep_pos <= 4:
                 return None
 
             data = response[4:sep_pos]
-            data_str = data.decode('cp1251', errors='ignore')
-            _logger.info(f"   Data string: '{data_str}'")
+            data_str = _CP1251_DECODE(data, 'ignore')[0]
+            _logger.debug("   Data string: '%s'", data_str)
 
-            fields = data_str.split('\t')
-            _logger.info(f"   Tab-separated fields: {len(fields)}")
+            fields = data_str.split('\t', 8)
+            _logger.debug("   Tab-separated fields: %d", len(fields))
 
             if len(fields) >= 8:
                 _logger.info("   ✅ Detected Datecs X protocol (8 tab fields)")
@@ -834,99 +887,19 @@ class DatecsFPIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         """Override - Datecs FP приоритизация."""
         return [9600, 19200, 115200, 38400]
 
-    @classmethod
-    def detect_device(cls, connection, baudrate: int) -> Optional[Dict[str, Any]]:
-        """
-        Детекция на Datecs FP устройство на ОТВОРЕНА connection.
-
-        ВАЖНО:
-        - connection е ВЕЧЕ отворена на baudrate
-        - НЕ променяме baudrate-а
-        - НЕ затваряме connection-а
-        """
-        _logger.debug(f"🔍 {cls.__name__} DETECTION at {baudrate} baud")
-
-        try:
-            # ISL STATUS команда
-            seq = 0x20
-            message = cls._build_detection_message(cls.CMD_GET_STATUS, b'', seq)
-
-            _logger.debug(f"   📤 TX: {message.hex(' ')}")
-            connection.write(message)
-            connection.flush()
-
-            time.sleep(0.5)
-
-            response = connection.read(256)
-            _logger.debug(f"   📥 RX ({len(response)} bytes): {response.hex(' ') if response else 'TIMEOUT'}")  # DEBUG
-
-            if not response or len(response) < 10:
-                return None
-
-            if response[0:1] != bytes([cls.MARKER_PREAMBLE]):
-                return None
-
-            if not cls._validate_checksum(response):
-                return None
-
-            _logger.debug(f"   ✅ Valid ISL response!")
-
-            # Изчакай устройството
-            connection.reset_input_buffer()
-            time.sleep(0.3)
-
-            # Device info със параметър "1"
-            info_msg = cls._build_detection_message(cls.CMD_GET_DEVICE_INFO, b'1', seq + 1)
-            _logger.debug(f"   📤 TX (device info): {info_msg.hex(' ')}")
-            connection.write(info_msg)
-            connection.flush()
-
-            time.sleep(0.8)
-
-            info_resp = bytearray()
-            start_time = time.time()
-            while time.time() - start_time < 1.5:
-                if connection.in_waiting > 0:
-                    chunk = connection.read(connection.in_waiting)
-                    info_resp.extend(chunk)
-                    time.sleep(0.05)
-                else:
-                    if len(info_resp) > 0:
-                        time.sleep(0.2)
-                        if connection.in_waiting == 0:
-                            break
-                    else:
-                        time.sleep(0.05)
-
-            info_resp = bytes(info_resp)
-            _logger.debug(f"   📥 RX (device info, {len(info_resp)} bytes)")
-
-            if info_resp and len(info_resp) > 20:
-                device_info = cls._parse_device_info(info_resp)
-                if device_info:
-                    _logger.info(f"   ✅ DETECTED: {device_info.get('model')} ({cls.__name__})")  # INFO само при успех
-                    _logger.info(f"   📋 Protocol: {device_info.get('protocol_name')}")
-                    return device_info
-
-            return None
-
-        except Exception as e:
-            _logger.error(f"   ⚠️ Exception: {e}", exc_info=True)
-            return None
-
     @staticmethod
     def _parse_device_info(response: bytes) -> Optional[Dict[str, Any]]:
         """Парсва Datecs FP device info."""
         try:
-            _logger.info(f"   🔍 Parsing Datecs FP device info from {len(response)} bytes")
+            _logger.debug("   🔍 Parsing Datecs FP device info from %d bytes", len(response))
 
-            sep_pos = response.find(bytes([0x04]))  # SEPARATOR
+            sep_pos = response.find(0x04)  # SEPARATOR
             if sep_pos == -1 or sep_pos <= 4:
                 return None
 
             data = response[4:sep_pos]
-            data_str = data.decode('cp1251', errors='ignore')
-            _logger.info(f"   Data string: '{data_str}'")
+            data_str = _CP1251_DECODE(data, 'ignore')[0]
+            _logger.debug("   Data string: '%s'", data_str)
 
             fields = data_str.split(',')
 
@@ -935,9 +908,9 @@ class DatecsFPIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
                 return {
                     'manufacturer': 'Datecs',
                     'model': fields[0].strip(),
-                    'firmware_version': fields[1].strip() if len(fields) > 1 else '',
-                    'serial_number': fields[2].strip() if len(fields) > 2 else 'UNKNOWN',
-                    'fiscal_memory_serial': fields[-1].strip() if fields else 'UNKNOWN',
+                    'firmware_version': fields[1].strip(),
+                    'serial_number': fields[2].strip(),
+                    'fiscal_memory_serial': fields[-1].strip(),
                     'protocol_name': 'datecs.fp.isl',
                 }
 
@@ -973,6 +946,51 @@ class DatecsFMPIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
     device_name = "Datecs FMP/FP v2 ISL Fiscal Printer"
     priority = 97  # Най-висок - най-нови модели
 
+    # FMP v2 статус: 8 байта, различна структура на битовете,
+    # байт 6 и 7 не се ползват (винаги 0x80)
+    _STATUS_SIZE = 8
+    # 6-байтов статус е стандартен ISL, не FMP v2
+    _DETECT_STATUS_SIZES = (8,)
+    _STATUS_BITS, _STATUS_MASK = _pack_status_bits((
+        (0, 0x01, "E401", "Syntax error", StatusMessageType.ERROR),
+        (0, 0x02, "E402", "Command code is invalid", StatusMessageType.ERROR),
+        (0, 0x04, "E103", "The real time clock is not synchronized", StatusMessageType.ERROR),
+        (0, 0x10, "E303", "Failure in printing mechanism", StatusMessageType.ERROR),
+        (0, 0x20, "E199", "General error", StatusMessageType.ERROR),
+        (0, 0x40, "E302", "Cover is open", StatusMessageType.ERROR),
+        (1, 0x01, "E403", "Overflow during command execution", StatusMessageType.ERROR),
+        (1, 0x02, "E404", "Command is not permitted", StatusMessageType.ERROR),
+        (2, 0x01, "E301", "End of paper", StatusMessageType.ERROR),
+        (2, 0x02, "W301", "Near paper end", StatusMessageType.WARNING),
+        (2, 0x04, "E206", "EJ is full", StatusMessageType.ERROR),
+        (2, 0x10, "W202", "EJ nearly full", StatusMessageType.WARNING),
+        (4, 0x01, "E202", "Error when trying to access data stored in the FM", StatusMessageType.ERROR),
+        (4, 0x08, "W201", "There is space for less then 60 reports in Fiscal memory", StatusMessageType.WARNING),
+        (4, 0x10, "E201", "Fiscal memory is full", StatusMessageType.ERROR),
+        (4, 0x20, "E299", "OR of all FM errors", StatusMessageType.ERROR),
+        (4, 0x40, "E203", "Fiscal memory is not found or damaged", StatusMessageType.ERROR),
+    ))
+
+    # FMP v2 използва числови кодове '1'-'8' за данъчни групи
+    _TAX_CODE_MAP = {
+        TaxGroup.TaxGroup1: "1",
+        TaxGroup.TaxGroup2: "2",
+        TaxGroup.TaxGroup3: "3",
+        TaxGroup.TaxGroup4: "4",
+        TaxGroup.TaxGroup5: "5",
+        TaxGroup.TaxGroup6: "6",
+        TaxGroup.TaxGroup7: "7",
+        TaxGroup.TaxGroup8: "8",
+    }
+
+    # FMP v2 payment mapping (PaidMode)
+    _PAYMENT_TYPE_MAP = MappingProxyType({
+        IslPaymentType.CASH: "0",
+        IslPaymentType.CARD: "2",  # debit card
+        IslPaymentType.CHECK: "1",  # credit card
+        IslPaymentType.RESERVED1: "3",  # other pay#3
+    })
+
     def __init__(self, identifier, device):
         super().__init__(identifier, device)
 
@@ -991,116 +1009,22 @@ class DatecsFMPIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         """Override - Datecs FMP v2 приоритизация."""
         return [115200, 57600, 38400, 19200]
 
-    @classmethod
-    def detect_device(cls, connection, baudrate: int) -> Optional[Dict[str, Any]]:
-        """
-        Детекция на Datecs FMP/FP v2 устройство на ОТВОРЕНА connection.
-
-        ВАЖНО:
-        - connection е ВЕЧЕ отворена на baudrate
-        - НЕ променяме baudrate-а
-        - НЕ затваряме connection-а
-        """
-        _logger.debug(f"🔍 DATECS FMP/FP v2 DETECTION at {baudrate} baud")
-
-        try:
-            # ISL STATUS команда
-            seq = 0x20
-            message = cls._build_detection_message(cls.CMD_GET_STATUS, b'', seq)
-
-            _logger.debug(f"   📤 TX: {message.hex(' ')}")
-            connection.write(message)
-            connection.flush()
-
-            time.sleep(0.5)
-
-            response = connection.read(256)
-            _logger.info(f"   📥 RX ({len(response)} bytes): {response.hex(' ') if response else 'TIMEOUT'}")
-
-            if not response or len(response) < 10:
-                return None
-
-            if response[0:1] != bytes([cls.MARKER_PREAMBLE]):
-                return None
-
-            if not cls._validate_checksum(response):
-                return None
-
-            _logger.debug(f"   ✅ Valid ISL response!")
-
-            # Проверка за 8-байтов статус (FMP v2 характеристика)
-            sep_pos = response.find(bytes([cls.MARKER_SEPARATOR]))
-            pst_pos = response.find(bytes([cls.MARKER_POSTAMBLE]))
-
-            if sep_pos > 0 and pst_pos > sep_pos:
-                status_bytes = response[sep_pos + 1:pst_pos]
-                _logger.info(f"   Status bytes length: {len(status_bytes)}")
-
-                if len(status_bytes) == 8:
-                    _logger.info("   ✅ Detected 8-byte status (FMP v2 protocol)")
-                elif len(status_bytes) == 6:
-                    _logger.info("   ⚠️ 6-byte status (standard ISL, not FMP v2)")
-                    return None  # Не е FMP v2
-
-            # Изчакай устройството
-            connection.reset_input_buffer()
-            time.sleep(0.3)
-
-            # Device info
-            info_msg = cls._build_detection_message(0x5A, b'1', seq + 1)
-            _logger.debug(f"   📤 TX (device info): {info_msg.hex(' ')}")
-            connection.write(info_msg)
-            connection.flush()
-
-            time.sleep(0.8)
-
-            info_resp = bytearray()
-            start_time = time.time()
-            while time.time() - start_time < 1.5:
-                if connection.in_waiting > 0:
-                    chunk = connection.read(connection.in_waiting)
-                    info_resp.extend(chunk)
-                    time.sleep(0.05)
-                else:
-                    if len(info_resp) > 0:
-                        time.sleep(0.2)
-                        if connection.in_waiting == 0:
-                            break
-                    else:
-                        time.sleep(0.05)
-
-            info_resp = bytes(info_resp)
-            _logger.info(f"   📥 RX (device info, {len(info_resp)} bytes)")
-
-            if info_resp and len(info_resp) > 20:
-                device_info = cls._parse_device_info(info_resp)
-                if device_info:
-                    _logger.info(f"   ✅ DETECTED: {device_info.get('model')} ({cls.__name__})")  # INFO само при успех
-                    _logger.info(f"   📋 Protocol: {device_info.get('protocol_name')}")
-                    return device_info
-
-            return None
-
-        except Exception as e:
-            _logger.error(f"   ⚠️ Exception: {e}", exc_info=True)
-            return None
-
     @staticmethod
     def _parse_device_info(response: bytes) -> Optional[Dict[str, Any]]:
         """Парсва Datecs FMP/FP v2 device info (8/9 полета с табулация)."""
         try:
-            _logger.info(f"   🔍 Parsing Datecs FMP v2 device info from {len(response)} bytes")
+            _logger.debug("   🔍 Parsing Datecs FMP v2 device info from %d bytes", len(response))
 
-            sep_pos = response.find(bytes([0x04]))
+            sep_pos = response.find(0x04)  # SEPARATOR
             if sep_pos == -1 or sep_pos <= 4:
                 return None
 
             data = response[4:sep_pos]
-            data_str = data.decode('cp1251', errors='ignore')
-            _logger.info(f"   Data string: '{data_str}'")
+            data_str = _CP1251_DECODE(data, 'ignore')[0]
+            _logger.debug("   Data string: '%s'", data_str)
 
-            fields = data_str.split('\t')
-            _logger.info(f"   Tab-separated fields: {len(fields)}")
+            fields = data_str.split('\t', 9)
+            _logger.debug("   Tab-separated fields: %d", len(fields))
 
             if len(fields) >= 9:
                 _logger.info("   ✅ Detected Datecs FMP v2 protocol (9+ tab fields)")
@@ -1131,79 +1055,6 @@ class DatecsFMPIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
             _logger.error(f"   ❌ Failed to parse Datecs FMP v2 device info: {e}", exc_info=True)
             return None
 
-    def _parse_datecs_status(self, status_bytes: bytes) -> DeviceStatus:
-        """
-        Парсва статус байтовете според FMP v2 документацията (8 байта).
-
-        Различия от стандартния ISL:
-        - 8 байта вместо 6
-        - Различна структура на битовете
-        - Byte 6 и 7 са not used (винаги 0x80)
-        """
-        status = DeviceStatus()
-
-        if not status_bytes or len(status_bytes) < 8:
-            return status
-
-        # Byte 0 - General purpose
-        if status_bytes[0] & 0x01:
-            status.add_error("E401", "Syntax error")
-        if status_bytes[0] & 0x02:
-            status.add_error("E402", "Command code is invalid")
-        if status_bytes[0] & 0x04:
-            status.add_error("E103", "The real time clock is not synchronized")
-        if status_bytes[0] & 0x10:
-            status.add_error("E303", "Failure in printing mechanism")
-        if status_bytes[0] & 0x20:
-            status.add_error("E199", "General error")
-        if status_bytes[0] & 0x40:
-            status.add_error("E302", "Cover is open")
-
-        # Byte 1 - General purpose
-        if status_bytes[1] & 0x01:
-            status.add_error("E403", "Overflow during command execution")
-        if status_bytes[1] & 0x02:
-            status.add_error("E404", "Command is not permitted")
-
-        # Byte 2 - Receipt and paper status
-        if status_bytes[2] & 0x01:
-            status.add_error("E301", "End of paper")
-        if status_bytes[2] & 0x02:
-            from .printer_driver_base_isl import StatusMessage, StatusMessageType
-            status.add_message(StatusMessage(
-                type=StatusMessageType.WARNING,
-                code="W301",
-                text="Near paper end"
-            ))
-        if status_bytes[2] & 0x04:
-            status.add_error("E206", "EJ is full")
-        if status_bytes[2] & 0x10:
-            from .printer_driver_base_isl import StatusMessage, StatusMessageType
-            status.add_message(StatusMessage(
-                type=StatusMessageType.WARNING,
-                code="W202",
-                text="EJ nearly full"
-            ))
-
-        # Byte 4 - Fiscal memory
-        if status_bytes[4] & 0x01:
-            status.add_error("E202", "Error when trying to access data stored in the FM")
-        if status_bytes[4] & 0x08:
-            from .printer_driver_base_isl import StatusMessage, StatusMessageType
-            status.add_message(StatusMessage(
-                type=StatusMessageType.WARNING,
-                code="W201",
-                text="There is space for less then 60 reports in Fiscal memory"
-            ))
-        if status_bytes[4] & 0x10:
-            status.add_error("E201", "Fiscal memory is full")
-        if status_bytes[4] & 0x20:
-            status.add_error("E299", "OR of all FM errors")
-        if status_bytes[4] & 0x40:
-            status.add_error("E203", "Fiscal memory is not found or damaged")
-
-        return status
-
     # ====================== FMP V2 СПЕЦИФИЧНИ OVERRIDE-И ======================
 
     def open_receipt(
@@ -1253,23 +1104,11 @@ class DatecsFMPIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         TaxCd: '1'-'8' (не 'А'-'З')
         DiscountType: '0'=no, '1'=surcharge%, '2'=discount%, '3'=surcharge sum, '4'=discount sum
         """
-        from decimal import Decimal as D
-
         max_len = self.info.item_text_max_length or 72
         name = item_text[:max_len]
 
         # FMP v2 използва числови кодове за данъчни групи
-        tax_code_mapping = {
-            TaxGroup.TaxGroup1: "1",
-            TaxGroup.TaxGroup2: "2",
-            TaxGroup.TaxGroup3: "3",
-            TaxGroup.TaxGroup4: "4",
-            TaxGroup.TaxGroup5: "5",
-            TaxGroup.TaxGroup6: "6",
-            TaxGroup.TaxGroup7: "7",
-            TaxGroup.TaxGroup8: "8",
-        }
-        tax_code = tax_code_mapping.get(tax_group, "1")
+        tax_code = self._TAX_CODE_MAP.get(tax_group, "1")
 
         # Discount type mapping
         discount_type = "0"
@@ -1278,25 +1117,25 @@ class DatecsFMPIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         if price_modifier_type != PriceModifierType.NONE:
             if price_modifier_type == PriceModifierType.SURCHARGE_PERCENT:
                 discount_type = "1"
-                discount_value = f"{price_modifier_value:.2f}"
+                discount_value = str(price_modifier_value.quantize(_Q2))
             elif price_modifier_type == PriceModifierType.DISCOUNT_PERCENT:
                 discount_type = "2"
-                discount_value = f"{price_modifier_value:.2f}"
+                discount_value = str(price_modifier_value.quantize(_Q2))
             elif price_modifier_type == PriceModifierType.SURCHARGE_AMOUNT:
                 discount_type = "3"
-                discount_value = f"{price_modifier_value:.2f}"
+                discount_value = str(price_modifier_value.quantize(_Q2))
             elif price_modifier_type == PriceModifierType.DISCOUNT_AMOUNT:
                 discount_type = "4"
-                discount_value = f"{price_modifier_value:.2f}"
+                discount_value = str(price_modifier_value.quantize(_Q2))
 
         # Department (0 = без департамент)
         dept = department if department > 0 else 0
 
         # Quantity format: 3 decimals
-        qty_str = f"{quantity:.3f}" if quantity != D("1") else "1.000"
+        qty_str = str(quantity.quantize(_Q3)) if quantity != _ONE else "1.000"
 
         # Изграждане на data string с табулация
-        item_data = f"{name}\t{tax_code}\t{unit_price:.2f}\t{qty_str}\t{discount_type}\t{discount_value}\t{dept}\t"
+        item_data = f"{name}\t{tax_code}\t{unit_price.quantize(_Q2)}\t{qty_str}\t{discount_type}\t{discount_value}\t{dept}\t"
 
         resp, status, _ = self._isl_request(self.CMD_FISCAL_RECEIPT_SALE, item_data)
         return resp, status
@@ -1310,33 +1149,17 @@ class DatecsFMPIslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
 
         PaidMode: '0'=cash, '1'=credit card, '2'=debit card, '3'=pay#3, '4'=pay#4, '5'=pay#5, '6'=foreign currency
         """
-        # FMP v2 payment mapping
-        fmp_payment_mapping = {
-            IslPaymentType.CASH: "0",
-            IslPaymentType.CARD: "2",  # debit card
-            IslPaymentType.CHECK: "1",  # credit card
-            IslPaymentType.RESERVED1: "3",  # other pay#3
-        }
-
-        if payment_type not in fmp_payment_mapping:
-            raise ValueError(f"Unsupported payment type for FMP v2: {payment_type}")
-
-        paid_mode = fmp_payment_mapping[payment_type]
+        try:
+            paid_mode = self._PAYMENT_TYPE_MAP[payment_type]
+        except KeyError:
+            raise ValueError(f"Unsupported payment type for FMP v2: {payment_type}") from None
 
         # FMP v2 използва табулация
-        payload = f"{paid_mode}\t{amount:.2f}\t"
+        payload = f"{paid_mode}\t{amount.quantize(_Q2)}\t"
 
         resp, status, _ = self._isl_request(self.CMD_FISCAL_RECEIPT_TOTAL, payload)
         return resp, status
 
-    def get_payment_type_mappings(self) -> Dict[IslPaymentType, str]:
-        """FMP v2 payment type mappings."""
-        return {
-            IslPaymentType.CASH: "0",
-            IslPaymentType.CARD: "2",
-            IslPaymentType.CHECK: "1",
-            IslPaymentType.RESERVED1: "3",
-        }
 
 
 # ====================== DATECS FP v1.00BG ПРОТОКОЛ (FP-800, FP-2000, FP-650, FMP-10) ======================
@@ -1366,6 +1189,9 @@ class DatecsFPv1IslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
     device_name = "Datecs FP v1.00BG ISL Fiscal Printer"
     priority = 98  # По-висок от FMP v2
 
+    _DETECT_INFO_DATA = b'*1'
+    _DETECT_STATUS_SIZES = (6,)
+
     # Специфични команди за FP v1.00BG
     CMD_EXTENDED_ERROR_INFO = 0x20  # 32
     CMD_SERVICE_CONTRACT_INFO = 0x22  # 34
@@ -1389,6 +1215,14 @@ class DatecsFPv1IslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
     CMD_GPRS_TEST = 0x87  # 135
     CMD_TAX_TERMINAL_INIT = 0x90  # 144
 
+    # FP v1.00BG payment mapping (PaidMode)
+    _PAYMENT_TYPE_MAP = MappingProxyType({
+        IslPaymentType.CASH: "P",
+        IslPaymentType.CARD: "D",  # debit card
+        IslPaymentType.CHECK: "C",  # check
+        IslPaymentType.RESERVED1: "N",  # credit
+    })
+
     def __init__(self, identifier, device):
         super().__init__(identifier, device)
 
@@ -1407,125 +1241,31 @@ class DatecsFPv1IslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         """Override - Datecs FP v1.00BG приоритизация."""
         return [115200, 9600, 19200, 38400, 57600]
 
-    @classmethod
-    def detect_device(cls, connection, baudrate: int) -> Optional[Dict[str, Any]]:
-        """
-        Детекция на Datecs FP v1.00BG устройство на ОТВОРЕНА connection.
-
-        ВАЖНО:
-        - connection е ВЕЧЕ отворена на baudrate
-        - НЕ променяме baudrate-а
-        - НЕ затваряме connection-а
-        """
-        _logger.debug(f"🔍 DATECS FP v1.00BG DETECTION at {baudrate} baud")
-
-        try:
-            # ISL STATUS команда
-            seq = 0x20
-            message = cls._build_detection_message(cls.CMD_GET_STATUS, b'', seq)
-
-            _logger.debug(f"   📤 TX: {message.hex(' ')}")
-            connection.write(message)
-            connection.flush()
-
-            time.sleep(0.5)
-
-            response = connection.read(256)
-            _logger.debug(f"   📥 RX ({len(response)} bytes): {response.hex(' ') if response else 'TIMEOUT'}")
-
-            if not response or len(response) < 10:
-                return None
-
-            if response[0:1] != bytes([cls.MARKER_PREAMBLE]):
-                return None
-
-            if not cls._validate_checksum(response):
-                return None
-
-            _logger.debug(f"   ✅ Valid ISL response!")
-
-            # Проверка за 6-байтов статус
-            sep_pos = response.find(bytes([cls.MARKER_SEPARATOR]))
-            pst_pos = response.find(bytes([cls.MARKER_POSTAMBLE]))
-
-            if sep_pos > 0 and pst_pos > sep_pos:
-                status_bytes = response[sep_pos + 1:pst_pos]
-                _logger.info(f"   Status bytes length: {len(status_bytes)}")
-                if len(status_bytes) != 6:
-                    _logger.info(f"   ⚠️ Not 6-byte status, skipping")
-                    return None
-
-            # Изчакай устройството
-            connection.reset_input_buffer()
-            time.sleep(0.3)
-
-            # Device info
-            info_msg = cls._build_detection_message(cls.CMD_GET_DEVICE_INFO, b'*1', seq + 1)
-            _logger.debug(f"   📤 TX (device info): {info_msg.hex(' ')}")
-            connection.write(info_msg)
-            connection.flush()
-
-            time.sleep(0.8)
-
-            info_resp = bytearray()
-            start_time = time.time()
-            while time.time() - start_time < 1.5:
-                if connection.in_waiting > 0:
-                    chunk = connection.read(connection.in_waiting)
-                    info_resp.extend(chunk)
-                    time.sleep(0.05)
-                else:
-                    if len(info_resp) > 0:
-                        time.sleep(0.2)
-                        if connection.in_waiting == 0:
-                            break
-                    else:
-                        time.sleep(0.05)
-
-            info_resp = bytes(info_resp)
-            _logger.debug(f"   📥 RX (device info, {len(info_resp)} bytes)")
-
-            if info_resp and len(info_resp) > 20:
-                device_info = cls._parse_device_info(info_resp)
-                if device_info:
-                    _logger.info(f"   ✅ DETECTED: {device_info.get('model')} ({cls.__name__})")  # INFO само при успех
-                    _logger.info(f"   📋 Protocol: {device_info.get('protocol_name')}")
-                    return device_info
-
-            return None
-
-        except Exception as e:
-            _logger.error(f"   ⚠️ Exception: {e}", exc_info=True)
-            return None
-
     @staticmethod
     def _parse_device_info(response: bytes) -> Optional[Dict[str, Any]]:
         """Парсва Datecs FP v1.00BG device info (6 полета със запетая)."""
         try:
-            _logger.info(f"   🔍 Parsing Datecs FP v1.00BG device info from {len(response)} bytes")
+            _logger.debug("   🔍 Parsing Datecs FP v1.00BG device info from %d bytes", len(response))
 
-            sep_pos = response.find(bytes([0x04]))
+            sep_pos = response.find(0x04)  # SEPARATOR
             if sep_pos == -1 or sep_pos <= 4:
                 return None
 
             data = response[4:sep_pos]
-            data_str = data.decode('cp1251', errors='ignore')
-            _logger.info(f"   Data string: '{data_str}'")
+            data_str = _CP1251_DECODE(data, 'ignore')[0]
+            _logger.debug("   Data string: '%s'", data_str)
 
-            fields = data_str.split(',')
-            _logger.info(f"   Comma-separated fields: {len(fields)}")
+            # Ограничен split - останалата част от низа не се разделя излишно
+            fields = data_str.split(',', 6)
+            _logger.debug("   Comma-separated fields: %d", len(fields))
 
             if len(fields) >= 6:
                 _logger.info("   ✅ Detected Datecs FP v1.00BG protocol (6 comma fields)")
-                fw_parts = fields[1].strip().split()
-                fw_version = fw_parts[0] if len(fw_parts) > 0 else fields[1].strip()
-                fw_date = fw_parts[1] if len(fw_parts) > 1 else ''
-                fw_time = fw_parts[2] if len(fw_parts) > 2 else ''
-
+                # "<версия> <дата> <час>" - първите три думи
                 return {
                     'manufacturer': 'Datecs',
                     'model': fields[0].strip(),
-                    'firmware_version': f"{fw_version} {fw_date} {fw_time}".strip(),
+                    'firmware_version': " ".join(fields[1].split()[:3]),
                     'serial_number': fields[4].strip(),
                     'fiscal_memory_serial': fields[5].strip(),
                     'protocol_name': 'datecs.fp.v1.isl',
@@ -1585,8 +1325,6 @@ class DatecsFPv1IslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         или
         [<L1>][<Lf><L2>]<Tab><Dept><Tab><[Sign]Price>[*<Qwan>[#UN]][,Perc|;Abs]
         """
-        from decimal import Decimal as D
-
         max_len = self.info.item_text_max_length or 42
         name = item_text[:max_len]
 
@@ -1596,12 +1334,12 @@ class DatecsFPv1IslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         if department <= 0:
             # с данъчна група
             tg_text = self.get_tax_group_text(tax_group)
-            item_data = f"{name}\t{tg_text}{unit_price:.2f}"
+            item_data = f"{name}\t{tg_text}{unit_price.quantize(_Q2)}"
         else:
-            item_data = f"{name}\t{department}\t{unit_price:.2f}"
+            item_data = f"{name}\t{department}\t{unit_price.quantize(_Q2)}"
 
-        if quantity != D("1"):
-            item_data += f"*{quantity:.3f}"
+        if quantity != _ONE:
+            item_data += f"*{quantity.quantize(_Q3)}"
 
         # Модификатори
         if price_modifier_type != PriceModifierType.NONE:
@@ -1620,7 +1358,7 @@ class DatecsFPv1IslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
             ):
                 value = -value
 
-            item_data += f"{sep}{value:.2f}"
+            item_data += f"{sep}{value.quantize(_Q2)}"
 
         resp, status, _ = self._isl_request(self.CMD_FISCAL_RECEIPT_SALE, item_data)
         return resp, status
@@ -1635,34 +1373,17 @@ class DatecsFPv1IslFiscalPrinterDriver(DatecsIslFiscalPrinterBase):
         PaidMode: 'P'=cash, 'N'=credit, 'C'=check, 'D'=debit card,
                   'I'-'L'=custom pay1-4, 'm'-'s'=custom pay5-11
         """
-        # FP v1.00BG payment mapping
-        fp_payment_mapping = {
-            IslPaymentType.CASH: "P",
-            IslPaymentType.CARD: "D",  # debit card
-            IslPaymentType.CHECK: "C",  # check
-            IslPaymentType.RESERVED1: "N",  # credit
-        }
-
-        if payment_type not in fp_payment_mapping:
-            raise ValueError(f"Unsupported payment type for FP v1.00BG: {payment_type}")
-
-        paid_mode = fp_payment_mapping[payment_type]
+        try:
+            paid_mode = self._PAYMENT_TYPE_MAP[payment_type]
+        except KeyError:
+            raise ValueError(f"Unsupported payment type for FP v1.00BG: {payment_type}") from None
 
         # FP v1.00BG формат
-        payload = f"\t{paid_mode}{amount:.2f}"
+        payload = f"\t{paid_mode}{amount.quantize(_Q2)}"
 
         resp, status, _ = self._isl_request(self.CMD_FISCAL_RECEIPT_TOTAL, payload)
         return resp, status
 
-    def get_payment_type_mappings(self) -> Dict[IslPaymentType, str]:
-        """FP v1.00BG payment type mappings."""
-        return {
-            IslPaymentType.CASH: "P",
-            IslPaymentType.CARD: "D",
-            IslPaymentType.CHECK: "C",
-            IslPaymentType.RESERVED1: "N",
-        }
-
     # ====================== FP v1.00BG СПЕЦИФИЧНИ КОМАНДИ ======================
 
     def print_storno_bon(
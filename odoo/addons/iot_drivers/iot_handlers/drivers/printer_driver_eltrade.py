@@ -5,7 +5,8 @@ import serial
 from dataclasses import dataclass
 from decimal import Decimal
 from enum import Enum
-from typing import Dict, Optional, Tuple, List, Any
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple, List, Any, Mapping
 from odoo.addons.iot_drivers.iot_handlers.drivers.serial_base_driver import (
     SerialProtocol,
 )
@@ -80,6 +81,26 @@ class EltradeIslFiscalPrinterDriver(IslFiscalPrinterBase):
 
     SERIAL_NUMBER_PREFIX = "ED"
 
+    # Eltrade групи A..H (синхронизирай с реалната документация/фърмуер)
+    _TAX_GROUP_MAP = {
+        TaxGroup.TaxGroup1: "A",
+        TaxGroup.TaxGroup2: "B",
+        TaxGroup.TaxGroup3: "C",
+        TaxGroup.TaxGroup4: "D",
+        TaxGroup.TaxGroup5: "E",
+        TaxGroup.TaxGroup6: "F",
+        TaxGroup.TaxGroup7: "G",
+        TaxGroup.TaxGroup8: "H",
+    }
+
+    _PAYMENT_TYPE_MAP = MappingProxyType({
+        PaymentType.CASH: "P",
+        PaymentType.CHECK: "N",
+        # Допълнителни типове плащане са Eltrade‑специфични – ползваме value за ключ
+        # в supported_payment_types, а тук – само мапинг към ISL буквата.
+        # "coupons", "ext_coupons", "packaging" и др. се използват на по-високо ниво.
+    })
+
     def __init__(self, identifier, device):
         super().__init__(identifier, device)
         self.info = EltradeDeviceInfo()
@@ -94,15 +115,7 @@ class EltradeIslFiscalPrinterDriver(IslFiscalPrinterBase):
             }
         )
         # Регистрация на POS actions по стандартния IoT канал
-        self._actions.update({
-            "pos_print_receipt": self._action_pos_print_receipt,
-            "pos_print_reversal_receipt": self._action_pos_print_reversal_receipt,
-            "pos_deposit_money": self._action_pos_deposit_money,
-            "pos_withdraw_money": self._action_pos_withdraw_money,
-            "pos_x_report": self._action_pos_x_report,
-            "pos_z_report": self._action_pos_z_report,
-            "pos_print_duplicate": self._action_pos_print_duplicate,
-        })
+        self._register_pos_actions()
 
     # ====================== DETECTION METHOD ======================
     @classmethod
@@ -118,10 +131,7 @@ class EltradeIslFiscalPrinterDriver(IslFiscalPrinterBase):
             # Изпращаме device constants команда
             message = cls._build_isl_detection_message(CMD_GET_DEVICE_CONSTANTS, b'')
 
-            connection.write(message)
-            time.sleep(0.2)
-
-            response = connection.read(256)
+            response = cls._detection_exchange(connection, message)
 
             if not response or len(response) < 10:
                 return None
@@ -198,61 +208,6 @@ class EltradeIslFiscalPrinterDriver(IslFiscalPrinterBase):
             _logger.debug(f"Failed to parse Eltrade device info: {e}")
             return None
 
-    def _action_pos_print_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_reversal_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_reversal_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_deposit_money(self, data: dict):
-        payload = data.get("data") or data
-        status = self.pos_deposit_money(payload)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_withdraw_money(self, data: dict):
-        payload = data.get("data") or data
-        status = self.pos_withdraw_money(payload)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_x_report(self, data: dict):
-        status = self.pos_x_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_z_report(self, data: dict):
-        status = self.pos_z_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_duplicate(self, data: dict):
-        status = self.pos_print_duplicate(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
     # ---------------------- Ниско ниво ISL ----------------------
 
     def _isl_request(self, command: int, data: str = "") -> Tuple[str, DeviceStatus, bytes]:
@@ -276,31 +231,15 @@ class EltradeIslFiscalPrinterDriver(IslFiscalPrinterBase):
         Често при Eltrade групите се обозначават с A, B, C... – при нужда
         го синхронизирай с реалната документация/фърмуер.
         """
-        mapping = {
-            TaxGroup.TaxGroup1: "A",
-            TaxGroup.TaxGroup2: "B",
-            TaxGroup.TaxGroup3: "C",
-            TaxGroup.TaxGroup4: "D",
-            TaxGroup.TaxGroup5: "E",
-            TaxGroup.TaxGroup6: "F",
-            TaxGroup.TaxGroup7: "G",
-            TaxGroup.TaxGroup8: "H",
-        }
-        return mapping[tax_group]
-
-    def get_payment_type_mappings(self) -> Dict[PaymentType, str]:
+        return self._TAX_GROUP_MAP[tax_group]
+
+    def get_payment_type_mappings(self) -> Mapping[PaymentType, str]:
         """
         Аналог на C# GetPaymentTypeMappings:
         Cash -> P, Check -> N, Coupons -> C, ExtCoupons -> D, Packaging -> I,
         InternalUsage -> J, Damage -> K, Card -> L, Bank -> M, Reserved1 -> Q, Reserved2 -> R.
         """
-        return {
-            PaymentType.CASH: "P",
-            PaymentType.CHECK: "N",
-            # Допълнителни типове плащане са Eltrade‑специфични – ползваме value за ключ
-            # в supported_payment_types, а тук – само мапинг към ISL буквата.
-            # "coupons", "ext_coupons", "packaging" и др. се използват на по-високо ниво.
-        }
+        return self._PAYMENT_TYPE_MAP
 
     # ---------------------- Device info / probing ----------------------
 
@@ -361,7 +300,7 @@ class EltradeIslFiscalPrinterDriver(IslFiscalPrinterBase):
             _logger.warning("Eltrade ISL: errors getting tax ID: %s", status_tax.errors)
         info.tax_identification_number = tax_id
 
-        info.supported_payment_types = self.get_payment_type_mappings()
+        info.supported_payment_types = dict(self.get_payment_type_mappings())
         info.supports_subtotal_amount_modifiers = True
 
         self.info = info
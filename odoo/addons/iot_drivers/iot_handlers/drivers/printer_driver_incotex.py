@@ -1,12 +1,12 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 import logging
-import time
 
 import serial
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import Dict, Optional, Tuple, List, Any
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple, List, Any, Mapping
 
 from odoo.addons.iot_drivers.iot_handlers.drivers.serial_base_driver import (
     SerialProtocol,
@@ -90,6 +90,22 @@ class IncotexIslFiscalPrinterDriver(IslFiscalPrinterBase):
 
     SERIAL_NUMBER_PREFIX = "IN"
 
+    # Incotex работи с групи A..D
+    _TAX_GROUP_MAP = {
+        TaxGroup.TaxGroup1: "A",
+        TaxGroup.TaxGroup2: "B",
+        TaxGroup.TaxGroup3: "C",
+        TaxGroup.TaxGroup4: "D",
+    }
+
+    # Порт на C# GetPaymentTypeMappings
+    _PAYMENT_TYPE_MAP = MappingProxyType({
+        PaymentType.CASH: "P",
+        PaymentType.CARD: "C",
+        PaymentType.CHECK: "N",
+        PaymentType.RESERVED1: "D",
+    })
+
     # Incotex специфични команди (останaлите идват от базовия ISL)
     CMD_GET_DEVICE_CONSTANTS = 0x80
     CMD_ABORT_FISCAL_RECEIPT = 0x82
@@ -105,15 +121,7 @@ class IncotexIslFiscalPrinterDriver(IslFiscalPrinterBase):
             }
         )
         # POS → ISL действия
-        self._actions.update({
-            "pos_print_receipt": self._action_pos_print_receipt,
-            "pos_print_reversal_receipt": self._action_pos_print_reversal_receipt,
-            "pos_deposit_money": self._action_pos_deposit_money,
-            "pos_withdraw_money": self._action_pos_withdraw_money,
-            "pos_x_report": self._action_pos_x_report,
-            "pos_z_report": self._action_pos_z_report,
-            "pos_print_duplicate": self._action_pos_print_duplicate,
-        })
+        self._register_pos_actions()
 
     # ====================== DETECTION METHOD ======================
 
@@ -130,10 +138,7 @@ class IncotexIslFiscalPrinterDriver(IslFiscalPrinterBase):
             # Изпращаме device constants команда
             message = cls._build_isl_detection_message(CMD_GET_DEVICE_CONSTANTS, b'')
 
-            connection.write(message)
-            time.sleep(0.2)
-
-            response = connection.read(256)
+            response = cls._detection_exchange(connection, message)
 
             if not response or len(response) < 10:
                 return None
@@ -201,59 +206,6 @@ class IncotexIslFiscalPrinterDriver(IslFiscalPrinterBase):
             _logger.debug(f"Failed to parse Incotex device info: {e}")
             return None
 
-    def _action_pos_print_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_reversal_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_reversal_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_deposit_money(self, data: dict):
-        status = self.pos_deposit_money(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_withdraw_money(self, data: dict):
-        status = self.pos_withdraw_money(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_x_report(self, data: dict):
-        status = self.pos_x_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_z_report(self, data: dict):
-        status = self.pos_z_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_duplicate(self, data: dict):
-        status = self.pos_print_duplicate(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
     # ---------------------- Ниско ниво ISL ----------------------
 
     def _isl_request(self, command: int, data: str = "") -> Tuple[str, DeviceStatus, bytes]:
@@ -276,27 +228,17 @@ class IncotexIslFiscalPrinterDriver(IslFiscalPrinterBase):
         """
         Incotex работи с групи A..D. Мапваме общите TaxGroup към тези букви.
         """
-        mapping = {
-            TaxGroup.TaxGroup1: "A",
-            TaxGroup.TaxGroup2: "B",
-            TaxGroup.TaxGroup3: "C",
-            TaxGroup.TaxGroup4: "D",
-        }
-        if tax_group not in mapping:
-            raise ValueError(f"Unsupported tax group for Incotex: {tax_group}")
-        return mapping[tax_group]
-
-    def get_payment_type_mappings(self) -> Dict[PaymentType, str]:
+        try:
+            return self._TAX_GROUP_MAP[tax_group]
+        except KeyError:
+            raise ValueError(f"Unsupported tax group for Incotex: {tax_group}") from None
+
+    def get_payment_type_mappings(self) -> Mapping[PaymentType, str]:
         """
         Порт на C# GetPaymentTypeMappings:
         Cash -> P, Card -> C, Check -> N, Reserved1 -> D
         """
-        return {
-            PaymentType.CASH: "P",
-            PaymentType.CARD: "C",
-            PaymentType.CHECK: "N",
-            PaymentType.RESERVED1: "D",
-        }
+        return self._PAYMENT_TYPE_MAP
 
     # ---------------------- Device info / constants ----------------------
 
@@ -424,7 +366,7 @@ class IncotexIslFiscalPrinterDriver(IslFiscalPrinterBase):
             _logger.warning("Incotex ISL: errors getting tax ID: %s", status_tax.errors)
         info.tax_identification_number = tax_id
 
-        info.supported_payment_types = self.get_payment_type_mappings()
+        info.supported_payment_types = dict(self.get_payment_type_mappings())
         info.supports_subtotal_amount_modifiers = True
 
         self.info = info
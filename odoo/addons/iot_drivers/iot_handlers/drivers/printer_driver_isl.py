@@ -1,11 +1,11 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
 import logging
-import time
 
 import serial
 from dataclasses import dataclass
-from typing import Dict, Optional, Tuple, List, Any
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple, List, Any, Mapping
 
 from odoo.addons.iot_drivers.iot_handlers.drivers.serial_base_driver import (
     SerialDriver,
@@ -74,6 +74,14 @@ class IslIcpFiscalPrinterDriver(IslFiscalPrinterBase):
 
     SERIAL_NUMBER_PREFIX = "IS"
 
+    # Mapping от общите PaymentType към ICP кодовете
+    _PAYMENT_TYPE_MAP = MappingProxyType({
+        PaymentType.CASH: "P",
+        PaymentType.CARD: "C",
+        PaymentType.CHECK: "N",
+        PaymentType.RESERVED1: "D",
+    })
+
     def __init__(self, identifier, device):
         super().__init__(identifier, device)
         self.info = IcpDeviceInfo()
@@ -100,10 +108,7 @@ class IslIcpFiscalPrinterDriver(IslFiscalPrinterBase):
             # Изпращаме device info команда
             message = cls._build_isl_detection_message(CMD_GET_DEVICE_INFO, b'')
 
-            connection.write(message)
-            time.sleep(0.2)
-
-            response = connection.read(256)
+            response = cls._detection_exchange(connection, message)
 
             if not response or len(response) < 10:
                 return None
@@ -300,7 +305,7 @@ class IslIcpFiscalPrinterDriver(IslFiscalPrinterBase):
         """
         return tax_group.value  # "1".."8"
 
-    def get_payment_type_mappings(self) -> Dict[PaymentType, str]:
+    def get_payment_type_mappings(self) -> Mapping[PaymentType, str]:
         """
         Mapping от общите PaymentType към ICP кодовете.
 
@@ -310,12 +315,7 @@ class IslIcpFiscalPrinterDriver(IslFiscalPrinterBase):
           CHECK    -> "N"
           RESERVED1 -> "D"
         """
-        return {
-            PaymentType.CASH: "P",
-            PaymentType.CARD: "C",
-            PaymentType.CHECK: "N",
-            PaymentType.RESERVED1: "D",
-        }
+        return self._PAYMENT_TYPE_MAP
 
     # ---------------------- Пробване и инициализация ----------------------
 
@@ -335,7 +335,7 @@ class IslIcpFiscalPrinterDriver(IslFiscalPrinterBase):
         info = self.parse_device_info(raw_info, auto_detect)
 
         # ICP връща EIK в raw_device_info, затова не викаме отделна команда.
-        info.supported_payment_types = self.get_payment_type_mappings()
+        info.supported_payment_types = dict(self.get_payment_type_mappings())
         info.supports_subtotal_amount_modifiers = False
 
         self.info = info
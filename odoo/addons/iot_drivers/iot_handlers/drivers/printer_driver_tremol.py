@@ -4,8 +4,13 @@
 import logging
 import serial
 import time
+from contextlib import contextmanager
 from enum import Enum
-from typing import Optional, Dict, Any, Tuple
+from functools import lru_cache, reduce, wraps
+from operator import xor
+from threading import Lock
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Tuple, Mapping
 
 from odoo.addons.iot_drivers.iot_handlers.drivers.serial_base_driver import (
     SerialDriver,
@@ -21,10 +26,75 @@ from .printer_driver_base_isl import (
     TaxGroup,
     PriceModifierType,
     PaymentType as IslPaymentType,
+    read_until_byte,
 )
 
 _logger = logging.getLogger(__name__)
 
+# Checksum байт → 2 ASCII байта (0x30 + nibble), готови за всички 256 стойности
+_CS_ASCII = tuple(bytes((0x30 + (i >> 4), 0x30 + (i & 0x0F))) for i in range(256))
+
+# NBL → следващ NBL в кръга 0x20..0x9F (стойности извън кръга се връщат в началото)
+_NEXT_NBL = bytes(i + 1 if 0x20 <= i < 0x9F else 0x20 for i in range(256))
+
+
+@lru_cache(maxsize=64)
+def _frame_template(command: int, data: str) -> Tuple[int, bytes, int]:
+    """
+    Неизменната част на Tremol кадър STX LEN NBL CMD DATA CS1 CS2 ETX.
+
+    Връща (LEN, CMD+DATA, XOR на LEN/CMD/DATA без NBL). NBL се сменя при
+    всяко изпращане и се добавя към checksum-а от _build_frame, така че
+    статус/отчетни команди с еднакви данни не се кодират и сумират наново.
+    """
+    data_bytes = data.encode('cp1251') if data else b''
+    len_byte = 3 + len(data_bytes) + 0x20    # LEN + NBL + CMD + DATA, според протокола
+    command &= 0xFF
+    return len_byte, bytes((command,)) + data_bytes, reduce(xor, data_bytes, len_byte ^ command)
+
+
+def _build_frame(command: int, data: str, nbl: int) -> bytes:
+    """Сглобява Tremol кадър от кеширания шаблон и текущия NBL."""
+    len_byte, tail, partial = _frame_template(command, data)
+    return b''.join((bytes((0x02, len_byte, nbl)), tail, _CS_ASCII[partial ^ nbl], b'\x0A'))
+
+
+def _read_response(connection) -> bytes:
+    """
+    Чете точно един Tremol отговор според първия му байт.
+
+    read(1024) чака целия timeout на порта (5 s), освен ако не дойдат 1024
+    байта. Дължината на отговора обаче е известна предварително:
+    - ACK:  <ACK><NBL><STE1><STE2><CS1><CS2><ETX> - 7 байта;
+    - DATA: STX LEN NBL CMD DATA CS1 CS2 ETX - LEN (- 0x20) брои LEN..DATA;
+    - NACK / RETRY - един байт.
+    Всяко read(n) връща веднага щом пристигнат n байта.
+    """
+    first = connection.read(1)
+    if not first:
+        return b""
+    if first[0] == 0x06:
+        return first + connection.read(6)
+    if first[0] == 0x02:
+        len_byte = connection.read(1)
+        if not len_byte:
+            return first
+        # след LEN остават NBL CMD DATA (LEN - 0x20 - 1) + CS1 CS2 ETX
+        return first + len_byte + connection.read(max(0, len_byte[0] - 0x20 + 2))
+    return first
+
+
+def _device_locked(method):
+    """Публичен вариант на *_locked операция - взима _device_lock само за нея."""
+    @wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._device_lock:
+            return method(self, *args, **kwargs)
+    # _open_receipt_locked → open_receipt
+    locked.__name__ = method.__name__[1:].removesuffix('_locked')
+    locked.__qualname__ = locked.__qualname__.rsplit('.', 1)[0] + '.' + locked.__name__
+    return locked
+
 
 # ====================== Енумерации и грешки (Tremol протокол) ======================
 
@@ -132,10 +202,23 @@ class TremolFiscalPrinterDriver(SerialDriver):
     _protocol = TremolBGProtocol
     priority = 20  # По-нисък приоритет от Datecs
 
+    # Флагове от първия статус байт на команда 0x20: (ключ, маска)
+    _STATUS_FLAGS = (
+        ('fm_read_only', 0x01),
+        ('power_down_in_receipt', 0x02),
+        ('printer_not_ready_overheat', 0x04),
+    )
+
     def __init__(self, identifier, device):
         super().__init__(identifier, device)
         self.device_type = 'fiscal_printer'
         self.message_counter = 0x20  # NBL започва от 0x20
+        # Отговорът на 0x21 е постоянен за устройството - кешира се след първото
+        # четене заедно с връзката, на която е прочетен. SerialDriver.run()/action()
+        # задават нова връзка при всяко (пре)отваряне, а на порта вече може да е
+        # друг принтер
+        self._version_cache: Optional[Dict[str, Any]] = None
+        self._version_conn = None
 
     # ====================== DETECTION METHOD ======================
     @classmethod
@@ -151,8 +234,8 @@ class TremolFiscalPrinterDriver(SerialDriver):
 
             # Изпращаме ENQ за проверка
             connection.write(ENQ)
-            time.sleep(0.1)
 
+            # read(1) блокира до първия байт (или timeout) - без фиксиран sleep
             response = connection.read(1)
 
             if response != ACK:
@@ -162,9 +245,7 @@ class TremolFiscalPrinterDriver(SerialDriver):
             # Изпращаме status команда (0x21) за информация
             info_msg = cls._build_tremol_message_static(0x21, "")
             connection.write(info_msg)
-            time.sleep(0.2)
-
-            info_response = connection.read(512)
+            info_response = read_until_byte(connection, 0x0A, timeout_s=1.2)
 
             if info_response:
                 device_info = cls._parse_tremol_device_info_static(info_response)
@@ -185,27 +266,8 @@ class TremolFiscalPrinterDriver(SerialDriver):
 
     @staticmethod
     def _build_tremol_message_static(cmd: int, data: str) -> bytes:
-        """Сглобява Tremol master/slave съобщение (статична версия)."""
-        STX = 0x02
-        ETX = 0x0A
-
-        data_bytes = data.encode('cp1251') if data else b''
-        length = 3 + len(data_bytes) + 0x20
-        nbl = 0x20
-
-        core = bytes([length, nbl, cmd]) + data_bytes
-
-        # XOR checksum
-        checksum = 0
-        for b in core:
-            checksum ^= b
-
-        cs = bytes([
-            ((checksum >> 4) & 0x0F) + 0x30,
-            (checksum & 0x0F) + 0x30,
-        ])
-
-        return bytes([STX]) + core + cs + bytes([ETX])
+        """Сглобява Tremol master/slave съобщение (статична версия, NBL 0x20)."""
+        return _build_frame(cmd, data, 0x20)
 
     @staticmethod
     def _parse_tremol_device_info_static(response: bytes) -> Optional[Dict[str, Any]]:
@@ -344,36 +406,15 @@ class TremolFiscalPrinterDriver(SerialDriver):
 
     # ---------------------- Ниско ниво протокол ----------------------
 
-    def _calculate_checksum(self, data: bytes) -> bytes:
-        """XOR checksum, конвертиран в 2 ASCII байта (с +0x30 на nibble)."""
-        checksum = 0
-        for b in data:
-            checksum ^= b
-
-        high = ((checksum >> 4) & 0x0F) + 0x30
-        low = (checksum & 0x0F) + 0x30
-        return bytes([high, low])
-
     def _build_message(self, command: int, data: str = "") -> bytes:
         """
         Сглобява пълно съобщение:
         STX(0x02) LEN NBL CMD DATA CS1 CS2 ETX(0x0A)
         """
-        data_bytes = data.encode('cp1251')
-
-        length = 3 + len(data_bytes)             # LEN + NBL + CMD + DATA
-        len_byte = length + 0x20                 # според протокола
-
         nbl = self.message_counter
-        self.message_counter += 1
-        if self.message_counter > 0x9F:
-            self.message_counter = 0x20
-
-        core = bytes([len_byte, nbl, command]) + data_bytes
+        self.message_counter = _NEXT_NBL[nbl]
 
-        checksum = self._calculate_checksum(core)
-        msg = b'\x02' + core + checksum + b'\x0A'
-        return msg
+        return _build_frame(command, data, nbl)
 
     def _send_message(self, message: bytes) -> bytes:
         """Изпраща съобщението и получава отговор от self._connection."""
@@ -383,9 +424,8 @@ class TremolFiscalPrinterDriver(SerialDriver):
         try:
             self._connection.write(message)
             self._connection.flush()
-            # протоколът позволява до 1024 байта; тук четем с timeout от SerialProtocol
-            response = self._connection.read(1024)
-            return response
+            # чете точно един кадър, вместо да чака timeout-а с read(1024)
+            return _read_response(self._connection)
         except Exception as e:  # noqa: BLE001
             _logger.error("Tremol: communication error: %s", e)
             raise FiscalPrinterError("COMMUNICATION", f"Communication failed: {e}") from e
@@ -395,11 +435,18 @@ class TremolFiscalPrinterDriver(SerialDriver):
         Парсва отговор от фискалното устройство.
         Връща (тип, данни) където тип е "ACK" или "DATA".
         """
+        first = response[0] if response else None
+
+        # NACK / RETRY са еднобайтови - проверяват се преди дължината
+        if first == 0x15:  # NACK
+            raise FiscalPrinterError("NACK", "Negative acknowledgment")
+
+        if first == 0x0E:  # RETRY
+            raise FiscalPrinterError("RETRY", "Device busy")
+
         if len(response) < 7:
             raise FiscalPrinterError("PROTOCOL", "Invalid response length")
 
-        first = response[0]
-
         if first == 0x06:  # ACK
             status1 = chr(response[2])
             status2 = chr(response[3])
@@ -412,12 +459,6 @@ class TremolFiscalPrinterDriver(SerialDriver):
 
             return "ACK", None
 
-        if first == 0x15:  # NACK
-            raise FiscalPrinterError("NACK", "Negative acknowledgment")
-
-        if first == 0x0E:  # RETRY
-            raise FiscalPrinterError("RETRY", "Device busy")
-
         if first == 0x02:  # Data message
             length = response[1] - 0x20
             # nbl = response[2]
@@ -476,32 +517,45 @@ class TremolFiscalPrinterDriver(SerialDriver):
         with self._device_lock:
             resp = self._send_command(0x20)
         if resp and len(resp) >= 14:
-            return {
-                'fm_read_only': bool(int(resp[0]) & 0x01),
-                'power_down_in_receipt': bool(int(resp[0]) & 0x02),
-                'printer_not_ready_overheat': bool(int(resp[0]) & 0x04),
-            }
+            status0 = int(resp[0])
+            return {key: bool(status0 & mask) for key, mask in self._STATUS_FLAGS}
         return {}
 
-    def get_version(self) -> Dict[str, Any]:
-        """Информация за устройството (команда 0x21)."""
+    def get_version(self, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Информация за устройството (команда 0x21).
+
+        Резултатът се кешира за текущата връзка - refresh=True принуждава
+        ново четене. При друга или затворена връзка кешът не се ползва.
+        """
+        connection = self._connection
+        if (self._version_cache and not refresh
+                and self._version_conn is connection and connection.is_open):
+            return dict(self._version_cache)
         with self._device_lock:
+            connection = self._connection
             resp = self._send_command(0x21)
         if resp:
             parts = resp.split(';')
             if len(parts) >= 5:
-                return {
+                self._version_conn = connection
+                self._version_cache = {
                     'device_type': parts[0],
                     'certificate_num': parts[1],
                     'certificate_date': parts[2],
                     'model': parts[3],
                     'version': parts[4],
                 }
+                return dict(self._version_cache)
         return {}
 
     # ---------------------- Фискален бон ----------------------
+    #
+    # *_locked операциите очакват _device_lock вече да е взет (receipt_session()
+    # или SerialDriver._do_action). Публичните имена под тях го взимат за едно
+    # извикване.
 
-    def open_receipt(
+    def _open_receipt_locked(
         self,
         operator_num: str = "1",
         operator_pass: str = "000000",
@@ -514,10 +568,9 @@ class TremolFiscalPrinterDriver(SerialDriver):
         data = f"{operator_num};{operator_pass};{receipt_format};{print_vat};{print_type}"
         if unique_receipt_num:
             data += f"${unique_receipt_num}"
-        with self._device_lock:
-            self._send_command(0x30, data)
+        self._send_command(0x30, data)
 
-    def sell_item(
+    def _sell_item_locked(
         self,
         name: str,
         vat_class: VATClass,
@@ -537,10 +590,9 @@ class TremolFiscalPrinterDriver(SerialDriver):
         if discount_value is not None:
             data += f":{discount_value:.2f}"
 
-        with self._device_lock:
-            self._send_command(0x31, data)
+        self._send_command(0x31, data)
 
-    def subtotal(
+    def _subtotal_locked(
         self,
         print_subtotal: bool = True,
         display_subtotal: bool = True,
@@ -554,8 +606,7 @@ class TremolFiscalPrinterDriver(SerialDriver):
         if discount_percent is not None:
             data += f",{discount_percent:.2f}"
 
-        with self._device_lock:
-            resp = self._send_command(0x33, data)
+        resp = self._send_command(0x33, data)
 
         if resp:
             try:
@@ -564,7 +615,7 @@ class TremolFiscalPrinterDriver(SerialDriver):
                 pass
         return 0.0
 
-    def payment(
+    def _payment_locked(
         self,
         payment_type: PaymentType = PaymentType.CASH,
         amount: float = 0.0,
@@ -576,23 +627,27 @@ class TremolFiscalPrinterDriver(SerialDriver):
         data = f"{payment_type.value};{change_option};{amount:.2f}"
         if not without_change:
             data += f";{change_type}"
-        with self._device_lock:
-            self._send_command(0x35, data)
+        self._send_command(0x35, data)
 
-    def cash_payment_and_close(self) -> None:
+    def _cash_payment_and_close_locked(self) -> None:
         """Плащане в брой за точната сума и затваряне (0x36)."""
-        with self._device_lock:
-            self._send_command(0x36)
+        self._send_command(0x36)
 
-    def close_receipt(self) -> None:
+    def _close_receipt_locked(self) -> None:
         """Затваряне на бон (0x38)."""
-        with self._device_lock:
-            self._send_command(0x38)
+        self._send_command(0x38)
 
-    def cancel_receipt(self) -> None:
+    def _cancel_receipt_locked(self) -> None:
         """Отказ на бон (0x39)."""
-        with self._device_lock:
-            self._send_command(0x39)
+        self._send_command(0x39)
+
+    open_receipt = _device_locked(_open_receipt_locked)
+    sell_item = _device_locked(_sell_item_locked)
+    subtotal = _device_locked(_subtotal_locked)
+    payment = _device_locked(_payment_locked)
+    cash_payment_and_close = _device_locked(_cash_payment_and_close_locked)
+    close_receipt = _device_locked(_close_receipt_locked)
+    cancel_receipt = _device_locked(_cancel_receipt_locked)
 
     # ---------------------- Сервизни функции ----------------------
 
@@ -622,6 +677,16 @@ class TremolFiscalPrinterDriver(SerialDriver):
         with self._device_lock:
             self._send_command(0x2B)
 
+    @contextmanager
+    def receipt_session(self):
+        """
+        Държи _device_lock за целия бон, така че операциите от друга нишка
+        не се вмъкват между open_receipt и затварянето. Вътре се викат
+        *_locked операциите - публичните биха взели lock-а отново.
+        """
+        with self._device_lock:
+            yield self
+
     # ---------------------- Примерен workflow ----------------------
 
     def print_simple_receipt_example(self) -> bool:
@@ -630,19 +695,24 @@ class TremolFiscalPrinterDriver(SerialDriver):
         Извиква се през IoT (action), не от main().
         """
         try:
-            self.open_receipt("1", "000000")
-            self.sell_item("Тестов артикул", VATClass.VAT_A, 10.00, quantity=1.0)
-            subtotal = self.subtotal()
-            _logger.info("Tremol: междинна сума: %.2f", subtotal)
-            self.cash_payment_and_close()
+            with self.receipt_session():
+                try:
+                    self._open_receipt_locked("1", "000000")
+                    self._sell_item_locked("Тестов артикул", VATClass.VAT_A, 10.00, quantity=1.0)
+                    subtotal = self._subtotal_locked()
+                    _logger.info("Tremol: междинна сума: %.2f", subtotal)
+                    self._cash_payment_and_close_locked()
+                except FiscalPrinterError:
+                    # отказът е в същата сесия - никой не пише между грешката и него
+                    try:
+                        self._cancel_receipt_locked()
+                    except Exception:  # noqa: BLE001
+                        pass
+                    raise
             self._status['status'] = self.STATUS_CONNECTED
             return True
         except FiscalPrinterError as e:
             _logger.error("Tremol: фискална грешка: %s", e)
-            try:
-                self.cancel_receipt()
-            except Exception:  # noqa: BLE001
-                pass
             self._status['status'] = self.STATUS_ERROR
             self._status['message_title'] = str(e)
             return False
@@ -689,6 +759,26 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
     device_type = "fiscal_printer"
     priority = 21  # Малко по-нисък приоритет от нативния Tremol драйвер
 
+    # Tremol VAT класове A..H
+    _TAX_GROUP_MAP = {
+        TaxGroup.TaxGroup1: "A",
+        TaxGroup.TaxGroup2: "B",
+        TaxGroup.TaxGroup3: "C",
+        TaxGroup.TaxGroup4: "D",
+        TaxGroup.TaxGroup5: "E",
+        TaxGroup.TaxGroup6: "F",
+        TaxGroup.TaxGroup7: "G",
+        TaxGroup.TaxGroup8: "H",
+    }
+
+    # Типичен Tremol mapping за ISL‑стил плащания
+    _PAYMENT_TYPE_MAP = MappingProxyType({
+        IslPaymentType.CASH: "P",
+        IslPaymentType.CARD: "C",
+        IslPaymentType.CHECK: "N",
+        IslPaymentType.RESERVED1: "D",
+    })
+
     def __init__(self, identifier, device):
         super().__init__(identifier, device)
         self.info = IslDeviceInfo(
@@ -705,16 +795,11 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
             }
         )
         self._message_counter = 0x20
+        # POS действията минават през SerialDriver._do_action, който държи
+        # _device_lock за целия бон - _frame_lock пази само един write/read обмен
+        self._frame_lock = Lock()
         # POS → ISL действия по стандартния IoT канал
-        self._actions.update({
-            "pos_print_receipt": self._action_pos_print_receipt,
-            "pos_print_reversal_receipt": self._action_pos_print_reversal_receipt,
-            "pos_deposit_money": self._action_pos_deposit_money,
-            "pos_withdraw_money": self._action_pos_withdraw_money,
-            "pos_x_report": self._action_pos_x_report,
-            "pos_z_report": self._action_pos_z_report,
-            "pos_print_duplicate": self._action_pos_print_duplicate,
-        })
+        self._register_pos_actions()
 
     # ====================== DETECTION METHOD ======================
     @classmethod
@@ -730,8 +815,8 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
 
             # Изпращаме ENQ за проверка
             connection.write(ENQ)
-            time.sleep(0.1)
 
+            # read(1) блокира до първия байт (или timeout) - без фиксиран sleep
             response = connection.read(1)
 
             if response != ACK:
@@ -740,10 +825,7 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
             # Успешна детекция – вземаме device info
             # Изпращаме status команда (0x21) за информация
             info_msg = cls._build_tremol_message_static(0x21, "")
-            connection.write(info_msg)
-            time.sleep(0.2)
-
-            info_response = connection.read(512)
+            info_response = cls._detection_exchange(connection, info_msg)
 
             if info_response:
                 device_info = cls._parse_tremol_device_info_static(info_response)
@@ -764,27 +846,8 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
 
     @staticmethod
     def _build_tremol_message_static(cmd: int, data: str) -> bytes:
-        """Сглобява Tremol master/slave съобщение (статична версия за ISL)."""
-        STX = 0x02
-        ETX = 0x0A
-
-        data_bytes = data.encode('cp1251') if data else b''
-        length = 3 + len(data_bytes) + 0x20
-        nbl = 0x20
-
-        core = bytes([length, nbl, cmd]) + data_bytes
-
-        # XOR checksum
-        checksum = 0
-        for b in core:
-            checksum ^= b
-
-        cs = bytes([
-            ((checksum >> 4) & 0x0F) + 0x30,
-            (checksum & 0x0F) + 0x30,
-        ])
-
-        return bytes([STX]) + core + cs + bytes([ETX])
+        """Сглобява Tremol master/slave съобщение (статична версия за ISL, NBL 0x20)."""
+        return _build_frame(cmd, data, 0x20)
 
     @staticmethod
     def _parse_tremol_device_info_static(response: bytes) -> Optional[Dict[str, Any]]:
@@ -821,23 +884,12 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
 
     def _get_next_message_number(self) -> int:
         num = self._message_counter
-        self._message_counter += 1
-        if self._message_counter > 0x9F:
-            self._message_counter = 0x20
+        self._message_counter = _NEXT_NBL[num]
         return num
 
     def _calculate_checksum(self, data: bytes) -> int:
-        """XOR checksum върху LEN+NBL+CMD+DATA."""
-        checksum = 0
-        for b in data:
-            checksum ^= b
-        return checksum & 0xFF
-
-    def _format_checksum(self, checksum: int) -> bytes:
-        """2 ASCII байта (0x30 + nibble)."""
-        high = ((checksum >> 4) & 0x0F) + 0x30
-        low = (checksum & 0x0F) + 0x30
-        return bytes([high, low])
+        """XOR checksum върху получения кадър (кадрите за изпращане - виж _build_frame)."""
+        return reduce(xor, data, 0)
 
     def _parse_checksum(self, checksum_bytes: bytes) -> int:
         if len(checksum_bytes) != 2:
@@ -851,19 +903,7 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
         STX LEN NBL CMD DATA CS1 CS2 ETX – стандартен Tremol frame.
         LEN = 0x20 + (1 (LEN) + 1 (NBL) + 1 (CMD) + len(DATA)).
         """
-        data_bytes = data.encode("cp1251") if data else b""
-
-        length = 3 + len(data_bytes)
-        len_byte = length + 0x20
-
-        nbl = self._get_next_message_number()
-        core = bytes([len_byte, nbl, command & 0xFF]) + data_bytes
-
-        checksum = self._calculate_checksum(core)
-        cs = self._format_checksum(checksum)
-
-        msg = b"\x02" + core + cs + b"\x0A"
-        return msg
+        return _build_frame(command, data, self._get_next_message_number())
 
     def _send_message_raw(self, message: bytes) -> bytes:
         if not self._connection or not self._connection.is_open:
@@ -871,8 +911,7 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
 
         self._connection.write(message)
         self._connection.flush()
-        response = self._connection.read(1024)
-        return response
+        return _read_response(self._connection)
 
     def _parse_response_frame(self, response: bytes) -> Tuple[str, DeviceStatus, bytes]:
         """
@@ -880,13 +919,20 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
         (ASCII payload, DeviceStatus, raw_status_bytes).
         """
         status = DeviceStatus()
+        first = response[0] if response else None
+
+        # NACK / RETRY - еднобайтови, преди проверката за дължина
+        if first == 0x15:
+            status.add_error("E101", "NACK from device")
+            return "", status, b""
+        if first == 0x0E:
+            status.add_error("E101", "Device busy (RETRY)")
+            return "", status, b""
 
         if len(response) < 7:
             status.add_error("E101", "Invalid response length")
             return "", status, b""
 
-        first = response[0]
-
         # ACK frame
         if first == 0x06:
             # <ACK><NBL><STE1><STE2><CS1><CS2><ETX>
@@ -912,14 +958,6 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
                 status.add_error("E" + status_code, f"{err_msg} / {cmd_msg}")
             return "", status, b""
 
-        # NACK / RETRY
-        if first == 0x15:
-            status.add_error("E101", "NACK from device")
-            return "", status, b""
-        if first == 0x0E:
-            status.add_error("E101", "Device busy (RETRY)")
-            return "", status, b""
-
         # DATA frame
         if first == 0x02:
             if len(response) < 7:
@@ -959,7 +997,7 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
         - Изпраща през self._connection;
         - Парсира ACK/DATA отговор и връща DeviceStatus + payload.
         """
-        with self._device_lock:
+        with self._frame_lock:
             try:
                 msg = self._build_message(command, data)
                 _logger.debug("Tremol ISL: send cmd 0x%02X data=%s", command, data)
@@ -979,21 +1017,12 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
         """
         Tremol VAT класове A..H – мапваме от TaxGroup1..8.
         """
-        mapping = {
-            TaxGroup.TaxGroup1: "A",
-            TaxGroup.TaxGroup2: "B",
-            TaxGroup.TaxGroup3: "C",
-            TaxGroup.TaxGroup4: "D",
-            TaxGroup.TaxGroup5: "E",
-            TaxGroup.TaxGroup6: "F",
-            TaxGroup.TaxGroup7: "G",
-            TaxGroup.TaxGroup8: "H",
-        }
-        if tax_group not in mapping:
-            raise ValueError(f"Unsupported tax group for Tremol ISL: {tax_group}")
-        return mapping[tax_group]
-
-    def get_payment_type_mappings(self) -> Dict[IslPaymentType, str]:
+        try:
+            return self._TAX_GROUP_MAP[tax_group]
+        except KeyError:
+            raise ValueError(f"Unsupported tax group for Tremol ISL: {tax_group}") from None
+
+    def get_payment_type_mappings(self) -> Mapping[IslPaymentType, str]:
         """
         Типичен Tremol mapping за ISL‑стил плащания:
 
@@ -1002,67 +1031,7 @@ class TremolIslFiscalPrinterDriver(IslFiscalPrinterBase):
         - Check -> "N"
         - Reserved1 -> "D"
         """
-        return {
-            IslPaymentType.CASH: "P",
-            IslPaymentType.CARD: "C",
-            IslPaymentType.CHECK: "N",
-            IslPaymentType.RESERVED1: "D",
-        }
-
-    # ---------------------- POS → ISL действия (през базовите POS helper-и) ----------------------
-
-    def _action_pos_print_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_reversal_receipt(self, data: dict):
-        pos_receipt = data.get("data") or data.get("receipt") or {}
-        info, status = self.pos_print_reversal_receipt(pos_receipt)
-        return {
-            "ok": status.ok,
-            "info": info,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_deposit_money(self, data: dict):
-        status = self.pos_deposit_money(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_withdraw_money(self, data: dict):
-        status = self.pos_withdraw_money(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_x_report(self, data: dict):
-        status = self.pos_x_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_z_report(self, data: dict):
-        status = self.pos_z_report(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
-
-    def _action_pos_print_duplicate(self, data: dict):
-        status = self.pos_print_duplicate(data.get("data") or data)
-        return {
-            "ok": status.ok,
-            "messages": [m.text for m in (status.messages + status.errors)],
-        }
+        return self._PAYMENT_TYPE_MAP
 
     # ---------------------- Поддръжка / избор на устройство ----------------------
     @classmethod
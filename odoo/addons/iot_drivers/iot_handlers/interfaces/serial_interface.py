@@ -1,15 +1,26 @@
 # Part of Odoo. See LICENSE file for full copyright and licensing details.
 
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
 from serial.tools.list_ports import comports
 
 from odoo.addons.iot_drivers.tools.system import IS_WINDOWS
 from odoo.addons.iot_drivers.interface import Interface
+from odoo.addons.iot_drivers.main import iot_devices, unsupported_devices
+
+_logger = logging.getLogger(__name__)
 
 
 class SerialInterface(Interface):
     connection_type = 'serial'
     allow_unsupported = True
 
+    def __init__(self):
+        super().__init__()
+        # identifier → (driver клас, инстанция, грешка) от паралелната проба
+        self._probed = {}
+
     def get_devices(self):
         """
         Открива серийни устройства.
@@ -33,3 +44,44 @@ class SerialInterface(Interface):
             }
 
         return serial_devices
+
+    def update_iot_devices(self, devices=None):
+        """
+        Драйверите на серийни устройства правят детекцията в supported() /
+        __init__ (отваряне на порта и проба на няколко baudrate-а), което
+        отнема секунди на порт. Когато има няколко нови порта, само
+        _probe_device() тече паралелно - по една нишка на порт.
+        iot_devices / unsupported_devices се попълват след това от
+        _register_device() в тази нишка, както при останалите интерфейси.
+        """
+        devices = devices or {}
+        pending = [
+            identifier for identifier in devices
+            if identifier not in iot_devices
+            and (identifier not in self._detected_devices or identifier in unsupported_devices)
+        ]
+        if len(pending) > 1:
+            with ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix='serial-detect') as executor:
+                futures = {
+                    identifier: executor.submit(self._probe_device, identifier, devices[identifier])
+                    for identifier in pending
+                }
+            for identifier, future in futures.items():
+                try:
+                    self._probed[identifier] = future.result()
+                except Exception:
+                    _logger.exception("❌ Serial detection failed for device %s", identifier)
+                    self._probed[identifier] = (None, None, None)
+
+        try:
+            super().update_iot_devices(devices)
+        finally:
+            self._probed.clear()
+
+    def add_device(self, identifier, device):
+        """Като Interface.add_device, но с готовия резултат от паралелната проба, ако има такъв."""
+        probed = self._probed.pop(identifier, None)
+        if probed is None:
+            super().add_device(identifier, device)
+        elif identifier not in iot_devices:
+            self._register_device(identifier, *probed)
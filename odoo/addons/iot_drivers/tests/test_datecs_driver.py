@@ -0,0 +1,86 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import time
+import unittest
+from itertools import count
+from threading import Lock
+
+from odoo.addons.iot_drivers.iot_handlers.drivers.printer_driver_datecs import (
+    DatecsFPv1IslFiscalPrinterDriver,
+)
+
+SYN = b'\x16'
+STATUS_OK = bytes((0x80,) * 6)
+
+
+def device_frame(command, data=b'', seq=0x21):
+    """Отговор на устройството: PRE LEN SEQ CMD DATA SEP STATUS PST BCC ETX."""
+    body = bytes((0x20 + 11 + len(data), seq, command)) + data + b'\x04' + STATUS_OK + b'\x05'
+    bcc = sum(body)
+    return (
+        b'\x01' + body
+        + bytes(0x30 + ((bcc >> shift) & 0x0F) for shift in (12, 8, 4, 0))
+        + b'\x03'
+    )
+
+
+class FakeSerial:
+    """
+    Връща на всяко read() следващото парче от chunks; след тях -
+    repeat (напр. безкрайни SYN) или празен отговор.
+    """
+
+    is_open = True
+    in_waiting = 0
+    timeout = 1
+
+    def __init__(self, chunks=(), repeat=b''):
+        self.chunks = list(chunks)
+        self.repeat = repeat
+        self.written = []
+
+    def write(self, data):
+        self.written.append(bytes(data))
+
+    def read(self, size=1):
+        return self.chunks.pop(0) if self.chunks else self.repeat
+
+
+class TestDatecsRawRequest(unittest.TestCase):
+
+    def _driver(self, connection):
+        # __init__ отваря порта и прави детекция - тук не е нужно
+        driver = DatecsFPv1IslFiscalPrinterDriver.__new__(DatecsFPv1IslFiscalPrinterDriver)
+        driver._frame_lock = Lock()
+        driver._frame_sequence_counter = count(1)
+        driver._rtt_ema = driver.RTT_EMA_INITIAL
+        driver._connection = connection
+        return driver
+
+    def test_response_frame(self):
+        driver = self._driver(FakeSerial([device_frame(0x4A, b'OK')]))
+
+        resp, status, status_bytes = driver._isl_request(0x4A)
+
+        self.assertEqual(resp, "OK")
+        self.assertEqual(status_bytes, STATUS_OK)
+        self.assertFalse(status.errors)
+        self.assertEqual(len(driver._connection.written), 1)
+
+    def test_syn_before_response(self):
+        driver = self._driver(FakeSerial([SYN, SYN, device_frame(0x4A, b'OK')]))
+
+        resp, _status, _status_bytes = driver._isl_request(0x4A)
+        self.assertEqual(resp, "OK")
+
+    def test_endless_syn_is_bounded(self):
+        driver = self._driver(FakeSerial(repeat=SYN))
+        driver.MAX_RESPONSE_TIME = 0.2
+        driver.MAX_WRITE_RETRIES = 2
+
+        started = time.monotonic()
+        self.assertIsNone(driver._raw_request(0x4A, None))
+        self.assertLess(time.monotonic() - started, 2)
+        # всеки опит е нов write и lock-ът е освободен
+        self.assertEqual(len(driver._connection.written), 2)
+        self.assertFalse(driver._frame_lock.locked())
@@ -0,0 +1,133 @@
+# Part of Odoo. See LICENSE file for full copyright and licensing details.
+
+import unittest
+from threading import Lock
+from unittest.mock import patch
+
+from odoo.addons.iot_drivers.iot_handlers.drivers.printer_driver_tremol import (
+    FiscalPrinterError,
+    TremolFiscalPrinterDriver,
+    TremolIslFiscalPrinterDriver,
+    _build_frame,
+)
+
+# <ACK><NBL><STE1><STE2><CS1><CS2><ETX> със статус "30" (OK)
+ACK_OK = bytes((0x06, 0x20, 0x33, 0x30, 0x32, 0x33, 0x0A))
+RETRY = b'\x0E'
+NACK = b'\x15'
+
+
+class FakeSerial:
+    """Отговаря на всеки write() със следващия отговор от списъка."""
+
+    is_open = True
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.written = []
+        self._buffer = b''
+
+    def write(self, data):
+        self.written.append(bytes(data))
+        self._buffer = self.replies.pop(0) if self.replies else b''
+
+    def flush(self):
+        pass
+
+    def read(self, size=1):
+        chunk, self._buffer = self._buffer[:size], self._buffer[size:]
+        return chunk
+
+
+@patch('odoo.addons.iot_drivers.iot_handlers.drivers.printer_driver_tremol.time.sleep')
+class TestTremolRetry(unittest.TestCase):
+
+    def _driver(self, replies):
+        driver = TremolFiscalPrinterDriver('/dev/ttyTEST', {})
+        driver._connection = FakeSerial(replies)
+        return driver
+
+    def test_retry_resends_command(self, _sleep):
+        driver = self._driver([RETRY, ACK_OK])
+
+        self.assertIsNone(driver._send_command(0x2B))
+        self.assertEqual(len(driver._connection.written), 2)
+        # всеки опит е нов кадър със същата команда
+        self.assertEqual(driver._connection.written[0][3], 0x2B)
+        self.assertEqual(driver._connection.written[1][3], 0x2B)
+
+    def test_retry_gives_up_after_max_retries(self, _sleep):
+        driver = self._driver([RETRY, RETRY, RETRY])
+
+        with self.assertRaises(FiscalPrinterError) as ctx:
+            driver._send_command(0x2B)
+        self.assertEqual(ctx.exception.error_code, "RETRY")
+        self.assertEqual(len(driver._connection.written), 3)
+
+    def test_nack_is_not_a_length_error(self, _sleep):
+        driver = self._driver([NACK])
+
+        with self.assertRaises(FiscalPrinterError) as ctx:
+            driver._send_command(0x2B)
+        self.assertEqual(ctx.exception.error_code, "NACK")
+
+
+class TestTremolIslResponse(unittest.TestCase):
+
+    def test_single_byte_replies(self):
+        # __init__ отваря порта и прави детекция - парсерът не зависи от това
+        driver = TremolIslFiscalPrinterDriver.__new__(TremolIslFiscalPrinterDriver)
+        for reply, text in ((RETRY, "Device busy (RETRY)"), (NACK, "NACK from device")):
+            _resp, status, _raw = driver._parse_response_frame(reply)
+            self.assertEqual([msg.text for msg in status.errors], [text])
+
+
+class TestTremolReceiptSession(unittest.TestCase):
+
+    def test_receipt_session_keeps_base_lock(self):
+        driver = TremolFiscalPrinterDriver('/dev/ttyTEST', {})
+        # open, sale, subtotal, cash payment - всяка команда получава ACK
+        driver._connection = FakeSerial([ACK_OK] * 4)
+
+        self.assertIsInstance(driver._device_lock, type(Lock()))
+        self.assertTrue(driver.print_simple_receipt_example())
+        self.assertEqual([frame[3] for frame in driver._connection.written], [0x30, 0x31, 0x33, 0x36])
+        # сесията е освободила lock-а
+        self.assertFalse(driver._device_lock.locked())
+
+    def test_public_operation_takes_lock(self):
+        driver = TremolFiscalPrinterDriver('/dev/ttyTEST', {})
+        driver._connection = FakeSerial([ACK_OK])
+
+        self.assertEqual(driver.open_receipt.__name__, 'open_receipt')
+        driver.open_receipt()
+        self.assertFalse(driver._device_lock.locked())
+
+
+class TestTremolVersionCache(unittest.TestCase):
+
+    @staticmethod
+    def _version_reply(version):
+        # DATA кадърът на устройството има същия формат като заявката
+        return _build_frame(0x21, f"FP;123;2024-01-01;ZFP;{version}", 0x20)
+
+    def test_version_cached_per_connection(self):
+        driver = TremolFiscalPrinterDriver('/dev/ttyTEST', {})
+        driver._connection = FakeSerial([self._version_reply("1.0")])
+
+        self.assertEqual(driver.get_version()['version'], "1.0")
+        self.assertEqual(driver.get_version()['version'], "1.0")
+        self.assertEqual(len(driver._connection.written), 1)
+
+        # нова връзка на същия порт - може да е друг принтер
+        driver._connection = FakeSerial([self._version_reply("2.0")])
+        self.assertEqual(driver.get_version()['version'], "2.0")
+
+    def test_version_not_served_from_closed_connection(self):
+        driver = TremolFiscalPrinterDriver('/dev/ttyTEST', {})
+        driver._connection = FakeSerial([self._version_reply("1.0")])
+        driver.get_version()
+
+        driver._connection.is_open = False
+        with self.assertRaises(FiscalPrinterError):
+            driver.get_version()